@@ -0,0 +1,34 @@
+"""Round-robin scheduling of enemy decisions ("think ticks").
+
+Deciding what an enemy wants to do (is the hero in range, which way to
+chase) is split from carrying it out. Movement runs every tick for every
+awake enemy, but decisions are spread over `interval` ticks: each tick the
+next slice of the enemy list thinks, so every enemy thinks once per
+interval and the work per tick stays flat. `budget` caps the decisions per
+tick; enemies cut off by it keep their last decision and are first in line
+on the next tick. The budget counts decisions, not time, so a run stays
+deterministic for replays.
+"""
+
+class AIScheduler:
+    def __init__(self, interval=1, budget=None):
+        self.interval = max(1, interval)
+        self.budget = budget
+        self.cursor = 0  # Where the next slice starts
+        self.evaluations = 0  # Decisions run on the last tick
+        self.deferred = 0  # Decisions due on the last tick but over budget
+        self.total = 0  # Decisions run since creation
+
+    def select(self, count):
+        """(start, n): enemies start..start+n-1 (mod count) think this tick"""
+        if count == 0:
+            self.evaluations = self.deferred = 0
+            return 0, 0
+        due = -(-count // self.interval)
+        n = due if self.budget is None else min(due, self.budget)
+        start = self.cursor % count
+        self.cursor = (start + n) % count
+        self.evaluations = n
+        self.deferred = due - n
+        self.total += n
+        return start, n
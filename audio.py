@@ -0,0 +1,192 @@
+"""Sound effects and music behind a small, failure-tolerant manager.
+
+* Sounds are loaded on first use and cached; paths are relative to this
+  module, not the working directory.
+* Each effect class gets its own reserved mixer channels, so a burst of
+  coin pickups or hits can only cut off sounds of the same class.
+* play() only queues an effect; flush() (once per frame) plays each queued
+  effect once, and an effect retriggered faster than its min_interval is
+  dropped.
+* preload() does the mixer setup and all loading up front; it is safe to
+  run on a background thread while the game keeps drawing.
+* With no audio device, no mixer or missing files everything silently
+  becomes a no-op.
+"""
+import os
+import threading
+import time
+
+SOUND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sounds")
+
+# Effect name -> (file, channel class, min seconds between two plays)
+EFFECTS = {
+    "jump": ("jump.wav", "player", 0.0),
+    "coin": ("coin.wav", "pickup", 0.05),
+    "hit": ("hit.wav", "damage", 0.15),
+    "victory": ("victory.wav", "jingle", 0.0),
+}
+# Channel class -> number of reserved mixer channels
+CHANNEL_POOLS = {"player": 1, "pickup": 2, "damage": 1, "jingle": 1}
+MUSIC_FILE = "background.wav"
+
+class NullBackend:
+    """Used when there is no mixer; accepts everything and plays nothing"""
+
+    def load(self, path):
+        return None
+
+    def reserve_channels(self, count):
+        return [None] * count
+
+    def play(self, channel, sound):
+        pass
+
+    def is_busy(self, channel):
+        return False
+
+    def play_music(self, path):
+        pass
+
+    def stop_music(self):
+        pass
+
+class PygameBackend:
+    def __init__(self):
+        import pygame
+
+        self.pygame = pygame
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+
+    def load(self, path):
+        return self.pygame.mixer.Sound(path)
+
+    def reserve_channels(self, count):
+        mixer = self.pygame.mixer
+        if mixer.get_num_channels() < count + 4:
+            mixer.set_num_channels(count + 4)
+        # Reserved channels are never picked by Sound.play()
+        mixer.set_reserved(count)
+        return [mixer.Channel(i) for i in range(count)]
+
+    def play(self, channel, sound):
+        channel.play(sound)
+
+    def is_busy(self, channel):
+        return channel.get_busy()
+
+    def play_music(self, path):
+        self.pygame.mixer.music.load(path)
+        self.pygame.mixer.music.play(-1)  # Loop infinito
+
+    def stop_music(self):
+        self.pygame.mixer.music.stop()
+
+class SoundManager:
+    def __init__(self, sound_dir=SOUND_DIR, backend=None):
+        self.sound_dir = sound_dir
+        self.backend = backend
+        self.cache = {}
+        self.pools = {}  # Channel class -> [channels], next index
+        self.queued = []
+        self.last_played = {}
+        self.failed = set()  # Files that could not be loaded; not retried
+        self.lock = threading.RLock()  # Guards setup and loading for preload()
+
+    def _ensure_backend(self):
+        if self.backend is not None and self.pools:
+            return self.backend
+        with self.lock:
+            return self._setup_backend()
+
+    def _setup_backend(self):
+        if self.backend is None:
+            try:
+                self.backend = PygameBackend()
+            except Exception as e:
+                print(f"Áudio indisponível, seguindo sem som: {e}")
+                self.backend = NullBackend()
+        if not self.pools:
+            channels = self.backend.reserve_channels(sum(CHANNEL_POOLS.values()))
+            pools = {}
+            start = 0
+            for name, count in CHANNEL_POOLS.items():
+                pools[name] = [channels[start:start + count], 0]
+                start += count
+            self.pools = pools
+        return self.backend
+
+    def sound(self, name):
+        """Cached Sound for an effect, loading it on first use"""
+        if name in self.cache:
+            return self.cache[name]
+        with self.lock:
+            if name not in self.cache:
+                self.cache[name] = self._load(name)
+        return self.cache[name]
+
+    def _load(self, name):
+        filename = EFFECTS[name][0]
+        sound = None
+        if filename not in self.failed:
+            try:
+                sound = self._ensure_backend().load(os.path.join(self.sound_dir, filename))
+            except Exception as e:
+                print(f"Erro ao carregar {filename}: {e}")
+                self.failed.add(filename)
+        return sound
+
+    def preload(self):
+        """Initialize the mixer and load every effect now instead of on first use"""
+        for name in EFFECTS:
+            self.sound(name)
+
+    def play(self, name):
+        """Queue an effect for this frame; repeats within a frame merge"""
+        if name not in self.queued:
+            self.queued.append(name)
+
+    def flush(self):
+        """Play the effects queued since the last flush"""
+        if not self.queued:
+            return
+        backend = self._ensure_backend()
+        now = time.monotonic()
+        for name in self.queued:
+            _, pool_name, min_interval = EFFECTS[name]
+            if now - self.last_played.get(name, -min_interval) < min_interval:
+                continue
+            sound = self.sound(name)
+            if sound is None:
+                continue
+            pool = self.pools[pool_name]
+            channels, next_index = pool
+            # Prefer an idle channel of the class; otherwise replace the
+            # oldest sound of the same class
+            channel = next((c for c in channels if not backend.is_busy(c)), channels[next_index])
+            pool[1] = (next_index + 1) % len(channels)
+            try:
+                backend.play(channel, sound)
+            except Exception as e:
+                print(f"Erro ao tocar {name}: {e}")
+            self.last_played[name] = now
+        self.queued.clear()
+
+    def play_music(self):
+        path = os.path.join(self.sound_dir, MUSIC_FILE)
+        if MUSIC_FILE in self.failed:
+            return
+        if not os.path.exists(path):
+            self.failed.add(MUSIC_FILE)
+            return
+        try:
+            self._ensure_backend().play_music(path)
+        except Exception as e:
+            print(f"Erro ao tocar {MUSIC_FILE}: {e}")
+            self.failed.add(MUSIC_FILE)
+
+    def stop_music(self):
+        try:
+            self._ensure_backend().stop_music()
+        except Exception as e:
+            print(f"Erro ao parar música: {e}")
@@ -0,0 +1,132 @@
+"""Collision broadphases against their linear scans.
+
+Hero vs entities: boxes the size of enemies are spread along a
+side-scrolling world at a fixed density and drift by up to the enemy chase
+speed every frame, like enemies do. Each frame the hero box is tested
+against all of them, by a linear AABB scan and by sweep-and-prune. Only the
+collision work is timed (moving the boxes is the same for both methods).
+
+Hero vs tiles: a level with N platforms is loaded into one TileMap and a
+hero-sized box is moved with world.move_solid from random spots, once with
+the tile window lookup (TileMap.boxes) and once with USE_TILE_WINDOW off,
+which tests every solid box of the level (TileMap.scan_boxes).
+
+    python -m benchmarks.bench_collision [--frames 200] [--seed 1]
+"""
+import argparse
+import random
+from time import perf_counter
+from types import SimpleNamespace
+
+import world as _world
+from collision import SweepAndPrune, rects_overlap
+from levels import LevelData
+from tilemap import TileMap, chunk_runs, to_tiles
+
+SIZES = (10, 1_000, 100_000)
+SPACING = 25  # World pixels per box
+MAX_STEP = 3  # Enemy chase speed (ENEMY_SPEED * 1.5)
+
+class Box:
+    __slots__ = ("x", "y", "width", "height")
+
+    def __init__(self, x, y, width, height):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+def linear_scan(hero, boxes):
+    return [box for box in boxes if rects_overlap(hero, box)]
+
+def run(count, frames, seed):
+    rng = random.Random(seed)
+    world_width = max(2000, count * SPACING)
+    boxes = [Box(rng.uniform(0, world_width), rng.uniform(400, 476), 24, 24) for _ in range(count)]
+    hero = Box(0, 450, 32, 32)
+    broadphase = SweepAndPrune(boxes)
+    steps = [rng.uniform(-MAX_STEP, MAX_STEP) for _ in range(count)]
+
+    linear = sap = 0.0
+    for frame in range(frames):
+        for box, step in zip(boxes, steps):
+            box.x += step if frame % 40 < 20 else -step
+        hero.x = rng.uniform(0, world_width)
+
+        start = perf_counter()
+        expected = linear_scan(hero, boxes)
+        middle = perf_counter()
+        broadphase.advance(MAX_STEP)
+        found = broadphase.overlapping(hero)
+        end = perf_counter()
+
+        linear += middle - start
+        sap += end - middle
+        if sorted(map(id, found)) != sorted(map(id, expected)):
+            raise AssertionError(f"broadphase disagrees with linear scan at frame {frame}")
+    return linear / frames, sap / frames, broadphase.resorts
+
+def tile_world(platforms, rng):
+    """Stand-in for a World with every chunk of an N-platform level loaded"""
+    width = max(2000, platforms * 200)
+    level = LevelData(width, (50, _world.GROUND_Y - 50))
+    for _ in range(platforms):
+        level.add_platform(rng.randrange(0, width, 10), rng.randrange(150, 460, 10),
+                           rng.randrange(40, 200, 10), 20)
+    tiles = TileMap(_world.HEIGHT // _world.TILE_SIZE, _world.GROUND_Y // _world.TILE_SIZE)
+    chunks = [chunk_runs(level.load_chunk(index), index * level.chunk_width,
+                         min((index + 1) * level.chunk_width, width),
+                         tiles.ground_row, len(tiles.rows))
+              for index in range(level.chunk_count)]
+    tiles.load(0, to_tiles(width), chunks)
+    return SimpleNamespace(tiles=tiles), width
+
+def run_tiles(platforms, frames, seed):
+    rng = random.Random(seed)
+    world, width = tile_world(platforms, rng)
+    world.tiles.all_boxes()  # Built once per load, not per query
+    hero = _world.Hero(0, 0)
+    # Start spots in open space only, as in play; inside a solid the result
+    # depends on how the tiles are cut into boxes
+    moves = []
+    while len(moves) < frames:
+        hero.x, hero.y = rng.uniform(0, width), rng.uniform(100, _world.GROUND_Y - hero.height)
+        if not any(rects_overlap(hero, box)
+                   for box in world.tiles.boxes(hero.x, hero.y, hero.width, hero.height)):
+            moves.append((hero.x, hero.y, rng.uniform(-8, 8), rng.uniform(-16, 16)))
+    times = {}
+    ends = {}
+    try:
+        for window in (False, True):
+            _world.USE_TILE_WINDOW = window
+            ends[window] = []
+            start = perf_counter()
+            for x, y, dx, dy in moves:
+                hero.x, hero.y = x, y
+                _world.move_solid(hero, dx, dy, world)
+                ends[window].append((hero.x, hero.y))
+            times[window] = perf_counter() - start
+    finally:
+        _world.USE_TILE_WINDOW = True
+    if ends[True] != ends[False]:
+        raise AssertionError("tile window disagrees with the linear scan")
+    return times[False] / frames, times[True] / frames, len(world.tiles.all_boxes())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'entities':>10} {'linear (us)':>12} {'sap (us)':>10} {'speedup':>8} {'resorts':>8}")
+    for count in SIZES:
+        linear, sap, resorts = run(count, args.frames, args.seed)
+        print(f"{count:>10} {linear * 1e6:>12.1f} {sap * 1e6:>10.1f} {linear / sap:>7.1f}x {resorts:>8}")
+
+    print(f"\n{'platforms':>10} {'linear (us)':>12} {'tiles (us)':>10} {'speedup':>8} {'boxes':>8}")
+    for count in SIZES:
+        linear, window, boxes = run_tiles(count, args.frames, args.seed)
+        print(f"{count:>10} {linear * 1e6:>12.1f} {window * 1e6:>10.1f} {linear / window:>7.1f}x {boxes:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Snapshot push and restore cost against the number of resident enemies.
+
+Each world is bench_world's synthetic level with the given number of
+enemies (and as many platforms and coins), 200 steps in. Snapshots are
+pushed into an in-memory SnapshotRing and restored from it. Cost grows
+with the entities near the camera, not with the level width.
+
+    python -m benchmarks.bench_snapshot [--repeat 200]
+"""
+import argparse
+from time import perf_counter
+
+from benchmarks.bench_world import make_world, scripted_inputs, synthetic_level
+from snapshot import SnapshotRing
+
+SIZES = (10, 1_000, 10_000, 100_000)
+# The enemy pool snapshots straight from its NumPy arrays
+VARIANTS = {"objects": {}, "enemy_pool": {"use_enemy_pool": True}}
+
+def run(count, options, repeat):
+    level = synthetic_level(count, count, count)
+    world = make_world(level, options)
+    for frame in range(200):
+        world.step(scripted_inputs(frame))
+    ring = SnapshotRing(capacity=repeat)
+    start = perf_counter()
+    for _ in range(repeat):
+        ring.push(world)
+    middle = perf_counter()
+    for _ in range(repeat):
+        ring.restore(world)
+    end = perf_counter()
+    return len(world.enemies), ring.slot_size, (middle - start) / repeat, (end - middle) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'entities':>10} {'variant':>11} {'resident':>9} {'slot (KiB)':>11} "
+          f"{'push (us)':>10} {'restore (us)':>13}")
+    for count in SIZES:
+        for name, options in VARIANTS.items():
+            try:
+                resident, slot, push, restore = run(count, options, args.repeat)
+            except ImportError:
+                continue  # enemy_pool without numpy
+            print(f"{count:>10} {name:>11} {resident:>9} {slot / 1024:>11.0f} "
+                  f"{push * 1e6:>10.1f} {restore * 1e6:>13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Simulation and rendering throughput on synthetic worlds.
+
+Worlds scale the level 1 pattern (a platform every 200 px at four heights,
+an enemy 100 px after each platform, a coin above each one) to N platforms,
+M enemies and K coins. For each world and simulation variant the hero runs
+right and hops, invulnerable, and the benchmark reports:
+
+* steps_per_sec: World.step() calls per second (no drawing)
+* ai_per_step: enemy AI decisions run per step (see ai.AIScheduler)
+* draw_fps: frames per second of render.draw_game() to an offscreen
+  surface through SDL's dummy video driver (skipped without pgzero)
+
+Results are written as JSON so runs from different commits can be diffed:
+
+    python -m benchmarks.bench_world --output bench.json
+    python -m benchmarks.bench_world --worlds 8x8x8 1000x1000x1000 --frames 300
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from time import perf_counter
+
+from levels import LevelData
+from world import World, Inputs, HEIGHT, PLAYING
+
+DEFAULT_WORLDS = ("8x8x8", "100x100x100", "1000x1000x1000", "10000x10000x10000")
+PLATFORM_HEIGHTS = (200, 300, 250, 350)  # Same cycle as level 1
+SPACING = 200
+
+# Simulation options compared for every world
+VARIANTS = {
+    "default": {},
+    "no_activity": {"active_radius": None},
+    "enemy_pool": {"use_enemy_pool": True},
+    "think_every_tick": {"think_interval": 1},
+}
+
+def synthetic_level(platforms, enemies, coins):
+    """Level 1's layout stretched to the given entity counts"""
+    slots = max(platforms, enemies, coins, 1)
+    width = SPACING * slots + 2 * SPACING
+    level = LevelData(width, (50, HEIGHT - 150))
+
+    def spread(count):
+        # Entity i of `count` goes to one of the `slots` platform slots
+        return (i * slots // count for i in range(count))
+
+    for slot in spread(platforms):
+        level.add_platform(200 + SPACING * slot, HEIGHT - PLATFORM_HEIGHTS[slot % 4], 150, 20)
+    for i, slot in enumerate(spread(enemies)):
+        level.add_enemy(300 + SPACING * slot, HEIGHT - 124, "strong" if i % 3 == 2 else "basic")
+    for slot in spread(coins):
+        level.add_coin(250 + SPACING * slot, HEIGHT - PLATFORM_HEIGHTS[slot % 4] - 20)
+    return level
+
+def parse_world(spec):
+    platforms, enemies, coins = (int(n) for n in spec.split("x"))
+    return platforms, enemies, coins
+
+def make_world(level, options):
+    world = World(seed=1, **options)
+    world.start(level_data=level)
+    world.hero.health = world.hero.max_health = 10 ** 9
+    return world
+
+def scripted_inputs(frame):
+    return Inputs(right=True, jump=frame % 45 == 0)
+
+def bench_steps(level, options, frames):
+    """(steps per second, AI decisions per step)"""
+    world = make_world(level, options)
+    step = world.step
+    evaluations = 0
+    start = perf_counter()
+    for frame in range(frames):
+        if world.game_state != PLAYING:
+            evaluations += world.ai.total
+            world = make_world(level, options)
+            step = world.step
+        step(scripted_inputs(frame))
+    elapsed = perf_counter() - start
+    return frames / elapsed, (evaluations + world.ai.total) / frames
+
+def bench_draw(level, options, frames, screen):
+    import render
+
+    world = make_world(level, options)
+    elapsed = 0.0
+    for frame in range(frames):
+        if world.game_state != PLAYING:
+            world = make_world(level, options)
+        world.step(scripted_inputs(frame))
+        start = perf_counter()
+        render.draw_game(screen, world)
+        elapsed += perf_counter() - start
+    return frames / elapsed
+
+def offscreen_screen():
+    """A pgzero Screen over a dummy-driver display, or None without pgzero"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    try:
+        import pygame
+        from pgzero.screen import Screen
+    except ImportError:
+        return None
+    from world import WIDTH
+
+    pygame.display.init()
+    pygame.font.init()
+    return Screen(pygame.display.set_mode((WIDTH, HEIGHT)))
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de simulação e desenho")
+    parser.add_argument("--worlds", nargs="+", default=DEFAULT_WORLDS,
+                        help="mundos como PLATAFORMASxINIMIGOSxMOEDAS")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--no-draw", action="store_true", help="mede só a simulação")
+    parser.add_argument("--output", help="arquivo JSON (padrão: saída padrão)")
+    args = parser.parse_args()
+
+    screen = None if args.no_draw else offscreen_screen()
+    results = []
+    for spec in args.worlds:
+        counts = parse_world(spec)
+        level = synthetic_level(*counts)
+        for variant in args.variants:
+            options = VARIANTS[variant]
+            if options.get("use_enemy_pool"):
+                try:
+                    import numpy  # noqa: F401
+                except ImportError:
+                    continue
+            steps_per_sec, ai_per_step = bench_steps(level, options, args.frames)
+            result = {"world": spec, "platforms": counts[0], "enemies": counts[1],
+                      "coins": counts[2], "variant": variant,
+                      "steps_per_sec": round(steps_per_sec, 1),
+                      "ai_per_step": round(ai_per_step, 2)}
+            if screen is not None:
+                result["draw_fps"] = round(bench_draw(level, options, args.frames, screen), 1)
+            results.append(result)
+            print(f"{spec:>20} {variant:>16} {result['steps_per_sec']:>12.1f} steps/s"
+                  + (f" {result['draw_fps']:>10.1f} fps" if "draw_fps" in result else ""),
+                  file=sys.stderr)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "frames": args.frames,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Checks that the simulation reproduces itself, for use before merging.
+
+Three guarantees other modules rely on, each run over several seeds of
+random play (restarting after game over and moving on after victory):
+
+* replay: a session recorded with replay.Recorder replays without a
+  mismatching frame, from a fresh World and from a resumed snapshot
+* pool: World(use_enemy_pool=True) gives the same hero, score and enemy
+  positions every frame as the Enemy objects, on levels 1 and 2
+  (skipped without numpy). The pool updates every resident enemy, so
+  both run with active_radius=None
+* snapshot: restoring a snapshot into another World, or rewinding a
+  SnapshotRing, and stepping the same inputs gives the same frames as
+  the run that was never interrupted
+
+Exits with status 1 at the first broken guarantee:
+
+    python -m benchmarks.check_determinism [--seeds 10] [--frames 1500]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+import snapshot
+from replay import Recorder, Recording, replay, state_hash
+from snapshot import SnapshotRing
+from world import World, Inputs, PLAYING
+
+REWIND = 30  # Ticks rewound by the snapshot check
+
+def random_inputs(seed, frames):
+    """Mostly run right and jump, and press start whenever a level ends"""
+    rng = random.Random(seed)
+    return [Inputs(left=rng.random() < 0.2, right=rng.random() < 0.7, jump=rng.random() < 0.2)
+            for _ in range(frames)]
+
+def play(world, inputs):
+    """Step `world` through inputs; returns the state after every step"""
+    trace = []
+    for frame_inputs in inputs:
+        if world.game_state != PLAYING:
+            frame_inputs = frame_inputs._replace(start=True)
+        world.step(frame_inputs)
+        trace.append(state(world))
+    return trace
+
+def state(world):
+    return (state_hash(world), world.game_state, world.level, world.frame,
+            tuple(world.enemy_positions()))
+
+def first_difference(a, b):
+    return next((frame for frame, (x, y) in enumerate(zip(a, b)) if x != y),
+                None if len(a) == len(b) else min(len(a), len(b)))
+
+def check_replay(seed, frames, path):
+    """Record a session, from the menu and from a snapshot, and replay both"""
+    inputs = random_inputs(seed, frames)
+    world = World(seed=seed)
+    recorder = Recorder(world)
+    for frame_inputs in inputs:
+        if world.game_state != PLAYING:
+            frame_inputs = frame_inputs._replace(start=True)
+        world.step(frame_inputs)
+        recorder.record(frame_inputs, world)
+    recorder.save(path)
+    mismatch = replay(Recording.load(path))
+    if mismatch is not None:
+        return f"fresh session diverges at frame {mismatch}"
+
+    resumed = World(seed=seed + 1)
+    snapshot.restore(resumed, snapshot.save(world))
+    recorder = Recorder(resumed)
+    for frame_inputs in random_inputs(seed + 1, frames):
+        if resumed.game_state != PLAYING:
+            frame_inputs = frame_inputs._replace(start=True)
+        resumed.step(frame_inputs)
+        recorder.record(frame_inputs, resumed)
+    recorder.save(path)
+    mismatch = replay(Recording.load(path))
+    if mismatch is not None:
+        return f"resumed session diverges at frame {mismatch}"
+    return None
+
+def check_pool(seed, frames):
+    """Enemy objects and the enemy pool, frame by frame, on levels 1 and 2"""
+    inputs = random_inputs(seed, frames)
+    for level in (1, 2):
+        traces = []
+        for use_enemy_pool in (False, True):
+            world = World(seed=seed, use_enemy_pool=use_enemy_pool, active_radius=None)
+            world.start(level)
+            traces.append(play(world, inputs))
+        frame = first_difference(*traces)
+        if frame is not None:
+            return f"level {level}: pool diverges from objects at frame {frame}"
+    return None
+
+def check_snapshot(seed, frames):
+    """Restore mid-run into another World, and rewind a ring, then replay"""
+    inputs = random_inputs(seed, frames)
+    world = World(seed=seed)
+    world.start()
+    middle = frames // 2
+    expected = play(world, inputs[:middle])
+    saved = snapshot.save(world)
+    expected += play(world, inputs[middle:])
+
+    restored = World(seed=seed + 1)
+    snapshot.restore(restored, saved)
+    frame = first_difference(play(restored, inputs[middle:]), expected[middle:])
+    if frame is not None:
+        return f"restored world diverges {frame} frames after the snapshot"
+
+    rewound = World(seed=seed)
+    rewound.start()
+    ring = SnapshotRing(capacity=REWIND + 1)
+    for frame_inputs in inputs[:middle]:
+        play(rewound, [frame_inputs])
+        ring.push(rewound)
+    back = ring.rewind(rewound, REWIND)
+    frame = first_difference(play(rewound, inputs[middle - back:]), expected[middle - back:])
+    if frame is not None:
+        return f"rewound world diverges {frame} frames after the rewind"
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seeds", type=int, default=10)
+    parser.add_argument("--frames", type=int, default=1500)
+    args = parser.parse_args()
+
+    try:
+        import numpy  # noqa: F401
+        pool = True
+    except ImportError:
+        pool = False
+    fd, path = tempfile.mkstemp(suffix=".rec")
+    os.close(fd)
+    checks = {
+        "replay": lambda seed: check_replay(seed, args.frames, path),
+        "pool": (lambda seed: check_pool(seed, args.frames)) if pool else None,
+        "snapshot": lambda seed: check_snapshot(seed, args.frames),
+    }
+    failed = False
+    try:
+        for name, check in checks.items():
+            if check is None:
+                print(f"{name:>9}: skipped (numpy not installed)")
+                continue
+            for seed in range(args.seeds):
+                error = check(seed)
+                if error is not None:
+                    print(f"{name:>9}: FAILED, seed {seed}: {error}")
+                    failed = True
+                    break
+            else:
+                print(f"{name:>9}: ok ({args.seeds} seeds x {args.frames} frames)")
+    finally:
+        os.remove(path)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Shared AABB tests and a sweep-and-prune broadphase on x.
+
+Every collision pass (hero vs coins and enemies) uses rects_overlap on
+objects with x, y, width and height attributes. Movement against
+platforms uses sweep, which finds the time of first contact along the
+whole move, so fast movers cannot tunnel through thin platforms and the
+face that is hit does not depend on the order platforms are checked.
+
+SweepAndPrune keeps objects sorted by left edge, so finding what can touch
+a box is a bisect instead of a scan; in a side-scroller almost everything
+is far away on x. Moving objects are not re-sorted every frame: callers
+report how far anything may have moved with advance(), queries widen by
+that slack, and the order is repaired (an adaptive sort, close to linear
+on nearly sorted data) only once the slack exceeds `resort_slack`.
+"""
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
+
+_get_x = attrgetter("x")
+INF = float("inf")
+
+def rects_overlap(a, b):
+    return (a.x < b.x + b.width and
+            a.x + a.width > b.x and
+            a.y < b.y + b.height and
+            a.y + a.height > b.y)
+
+def _axis_times(pos, size, delta, other_pos, other_size):
+    # Fractions of the move at which the intervals start and stop
+    # overlapping on one axis; None if they never do
+    if delta > 0:
+        return (other_pos - (pos + size)) / delta, (other_pos + other_size - pos) / delta
+    if delta < 0:
+        return (pos - (other_pos + other_size)) / -delta, (pos + size - other_pos) / -delta
+    if pos < other_pos + other_size and pos + size > other_pos:
+        return -INF, INF
+    return None
+
+def sweep(box, dx, dy, other):
+    """First contact of `box` moving by (dx, dy) with the static `other`
+
+    Returns (t, axis): t in [0, 1] is the fraction of the move done at
+    contact and axis ("x" or "y") tells which faces met; an exact corner
+    counts as "y", so landing wins over a side hit. None if the boxes do
+    not meet during the move or already overlap when it starts.
+    """
+    x_times = _axis_times(box.x, box.width, dx, other.x, other.width)
+    if x_times is None:
+        return None
+    y_times = _axis_times(box.y, box.height, dy, other.y, other.height)
+    if y_times is None:
+        return None
+    entry = max(x_times[0], y_times[0])
+    if entry >= min(x_times[1], y_times[1]) or entry < 0 or entry > 1:
+        return None
+    return entry, ("x" if x_times[0] > y_times[0] else "y")
+
+class SweepAndPrune:
+    def __init__(self, objects=(), resort_slack=64):
+        self.objects = sorted(objects, key=_get_x)
+        self.xs = [obj.x for obj in self.objects]
+        self.max_width = max((obj.width for obj in self.objects), default=0)
+        self.resort_slack = resort_slack
+        self.slack = 0.0  # How far any object may have drifted from xs
+        self.resorts = 0
+
+    def __len__(self):
+        return len(self.objects)
+
+    def insert(self, obj):
+        index = bisect_right(self.xs, obj.x)
+        self.xs.insert(index, obj.x)
+        self.objects.insert(index, obj)
+        self.max_width = max(self.max_width, obj.width)
+
+    def remove(self, obj):
+        # Stored keys may be stale by up to `slack`, so search that window
+        index = bisect_left(self.xs, obj.x - self.slack)
+        objects = self.objects
+        while objects[index] is not obj:
+            index += 1
+        del objects[index]
+        del self.xs[index]
+
+    def advance(self, max_distance):
+        """Record that objects may have moved up to max_distance on x"""
+        self.slack += max_distance
+        if self.slack > self.resort_slack:
+            self.resort()
+
+    def resort(self):
+        self.objects.sort(key=_get_x)
+        self.xs = list(map(_get_x, self.objects))
+        self.slack = 0.0
+        self.resorts += 1
+
+    def query(self, left, right):
+        """Objects whose box may overlap the x interval [left, right)"""
+        slack = self.slack
+        lo = bisect_right(self.xs, left - self.max_width - slack)
+        hi = bisect_left(self.xs, right + slack)
+        return self.objects[lo:hi]
+
+    def overlapping(self, box):
+        """Objects whose box really overlaps `box`"""
+        return [obj for obj in self.query(box.x, box.x + box.width) if rects_overlap(box, obj)]
@@ -0,0 +1,267 @@
+"""Structure-of-arrays enemy storage updated in one vectorized pass.
+
+EnemyPool mirrors Enemy.update exactly (same float64 arithmetic, same
+tile landing rule as tilemap.TileMap.landing_y) but keeps every field in a
+contiguous NumPy array so thousands of enemies cost a handful of array
+operations per frame.
+Requires numpy; world.py only imports this module when the pool is enabled.
+"""
+import numpy as np
+
+import world as _world
+from tilemap import EMPTY
+
+ENEMY_WIDTH = 24
+ENEMY_HEIGHT = 24
+ENEMY_TYPES = ("basic", "strong")
+
+class EnemyView:
+    """Read-only Enemy-like handle onto one slot of the pool (for drawing)"""
+    __slots__ = ("pool", "index")
+
+    width = ENEMY_WIDTH
+    height = ENEMY_HEIGHT
+
+    def __init__(self, pool, index):
+        self.pool = pool
+        self.index = index
+
+    @property
+    def x(self):
+        return float(self.pool.x[self.index])
+
+    @property
+    def y(self):
+        return float(self.pool.y[self.index])
+
+    @property
+    def prev_x(self):
+        return float(self.pool.prev_x[self.index])
+
+    @property
+    def prev_y(self):
+        return float(self.pool.prev_y[self.index])
+
+    @property
+    def type(self):
+        return ENEMY_TYPES[self.pool.type[self.index]]
+
+    @property
+    def health(self):
+        return int(self.pool.health[self.index])
+
+    @property
+    def is_attacking(self):
+        return bool(self.pool.is_attacking[self.index])
+
+    @property
+    def animation_frame(self):
+        return int(self.pool.animation_frame[self.index])
+
+class EnemyPool:
+    def __init__(self, count):
+        self.x = np.zeros(count)
+        self.y = np.zeros(count)
+        self.prev_x = np.zeros(count)
+        self.prev_y = np.zeros(count)
+        self.vel_x = np.zeros(count)
+        self.vel_y = np.zeros(count)
+        self.patrol_start = np.zeros(count)
+        self.patrol_end = np.zeros(count)
+        self.attack_timer = np.zeros(count, dtype=np.int32)
+        self.type = np.zeros(count, dtype=np.int8)
+        self.health = np.zeros(count, dtype=np.int32)
+        self.max_health = np.zeros(count, dtype=np.int32)
+        self.animation_frame = np.zeros(count, dtype=np.int32)
+        self.animation_timer = np.zeros(count, dtype=np.int32)
+        self.on_ground = np.zeros(count, dtype=bool)
+        self.is_attacking = np.zeros(count, dtype=bool)
+        self.next_hit_frame = np.zeros(count, dtype=np.int32)
+        self.set_tiles(None)
+
+    @classmethod
+    def from_enemies(cls, enemies, tiles=None):
+        """Copy a list of Enemy objects into a new pool"""
+        pool = cls(len(enemies))
+        for i, enemy in enumerate(enemies):
+            pool.x[i] = enemy.x
+            pool.y[i] = enemy.y
+            pool.prev_x[i] = enemy.prev_x
+            pool.prev_y[i] = enemy.prev_y
+            pool.vel_x[i] = enemy.vel_x
+            pool.vel_y[i] = enemy.vel_y
+            pool.patrol_start[i] = enemy.patrol_start
+            pool.patrol_end[i] = enemy.patrol_end
+            pool.attack_timer[i] = enemy.attack_timer
+            pool.type[i] = ENEMY_TYPES.index(enemy.type)
+            pool.health[i] = enemy.health
+            pool.max_health[i] = enemy.max_health
+            pool.animation_frame[i] = enemy.animation_frame
+            pool.animation_timer[i] = enemy.animation_timer
+            pool.on_ground[i] = enemy.on_ground
+            pool.is_attacking[i] = enemy.is_attacking
+            pool.next_hit_frame[i] = enemy.next_hit_frame
+        pool.set_tiles(tiles)
+        return pool
+
+    def write_back(self, enemies):
+        """Copy pool state back onto the matching Enemy objects"""
+        for i, enemy in enumerate(enemies):
+            enemy.x = float(self.x[i])
+            enemy.y = float(self.y[i])
+            enemy.prev_x = float(self.prev_x[i])
+            enemy.prev_y = float(self.prev_y[i])
+            enemy.vel_x = float(self.vel_x[i])
+            enemy.vel_y = float(self.vel_y[i])
+            enemy.attack_timer = int(self.attack_timer[i])
+            enemy.health = int(self.health[i])
+            enemy.animation_frame = int(self.animation_frame[i])
+            enemy.animation_timer = int(self.animation_timer[i])
+            enemy.on_ground = bool(self.on_ground[i])
+            enemy.is_attacking = bool(self.is_attacking[i])
+            enemy.next_hit_frame = int(self.next_hit_frame[i])
+
+    def set_tiles(self, tiles):
+        """Copy which tiles of a tilemap.TileMap are tops, for the landing pass
+
+        Columns 0 and -1 of the grid stand for every column left and right
+        of the map's window, which read as its default column.
+        """
+        if tiles is None:
+            self.tops = np.zeros((0, 2), dtype=bool)
+            self.tile_size = 1
+            self.tile_origin = 0
+            return
+        rows = len(tiles.rows)
+        solid = np.empty((rows, tiles.columns + 2), dtype=bool)
+        for row, cells in enumerate(tiles.rows):
+            solid[row, 1:-1] = np.frombuffer(bytes(cells), dtype=np.uint8) != EMPTY
+        solid[:, 0] = solid[:, -1] = np.frombuffer(tiles.default, dtype=np.uint8) != EMPTY
+        tops = solid.copy()
+        tops[1:] &= ~solid[:-1]  # Solid under empty (row 0 has nothing above)
+        self.tops = tops
+        self.tile_size = tiles.tile_size
+        self.tile_origin = tiles.origin
+
+    def __len__(self):
+        return len(self.x)
+
+    def update(self, hero, substeps=1, thinking=None):
+        """Vectorized equivalent of Enemy.think and Enemy.move for every enemy
+
+        `thinking` is the AIScheduler's (start, n) slice of enemies that
+        decide this tick; None lets every enemy think.
+        """
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+        x = self.x
+        vel_x = self.vel_x
+        attack_timer = self.attack_timer
+
+        # Think: check if hero is nearby (within attack range)
+        if thinking is None:
+            thinks = np.ones(len(x), dtype=bool)
+        else:
+            start, n = thinking
+            thinks = np.zeros(len(x), dtype=bool)
+            thinks[(start + np.arange(n)) % max(len(x), 1)] = True
+        in_range = np.abs(x - hero.x) < 100
+        self.is_attacking[thinks] = in_range[thinks]
+        attack = thinks & in_range
+        attack_timer[attack] = 60
+        # Move towards hero, faster when attacking
+        speed = _world.ENEMY_SPEED * 1.5
+        vel_x[attack] = np.where(hero.x < x[attack], -speed, speed)
+
+        # Move: carry out the last decision
+        chasing = self.is_attacking & (attack_timer > 0)
+        attack_timer[chasing] -= 1
+
+        # Reverse direction at patrol boundaries
+        reverse = ~chasing & ((x <= self.patrol_start) | (x >= self.patrol_end))
+        vel_x[reverse] = -vel_x[reverse]
+
+        for _ in range(substeps):
+            # Apply gravity, then move, landing on the first tile top
+            # reached during the move
+            self.vel_y += _world.GRAVITY / substeps
+            dx = vel_x / substeps
+            dy = self.vel_y / substeps
+            landed_y = self._landing_y(dx, dy)
+            x += dx
+            self.on_ground[:] = False
+            landed = ~np.isnan(landed_y)
+            self.y += np.where(landed, 0, dy)
+            self.y[landed] = landed_y[landed]
+            self.vel_y[landed] = 0
+            self.on_ground[landed] = True
+
+        # Update animation
+        self.animation_timer += 1
+        wrap = self.animation_timer >= 12
+        self.animation_timer[wrap] = 0
+        self.animation_frame[wrap] = (self.animation_frame[wrap] + 1) % 3
+
+    def _landing_y(self, dx, dy):
+        """New y of each enemy that lands on a tile top during the move, else NaN
+
+        Same rule and arithmetic as TileMap.landing_y: row boundaries are
+        tried in the order the feet reach them, over every column the
+        enemy spans at that moment.
+        """
+        landing_y = np.full(len(self.x), np.nan)
+        tops = self.tops
+        rows = tops.shape[0]
+        falling = dy > 0
+        if not rows or not falling.any():
+            return landing_y
+        size = self.tile_size
+        x = self.x
+        bottom = self.y + ENEMY_HEIGHT
+        row = np.ceil(bottom / size)
+        # Boundaries the fastest feet can cross, and columns an enemy can span
+        crossings = int(np.ceil(dy[falling].max() / size)) + 1
+        spans = np.arange(-(-ENEMY_WIDTH // size) + 1)
+        width = tops.shape[1]
+        flat = tops.ravel()
+        pending = falling.copy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for _ in range(crossings):
+                t = (row * size - bottom) / dy
+                pending &= (t <= 1) & (row < rows)
+                if not pending.any():
+                    break
+                left = x + dx * t
+                columns = np.floor(left / size)[:, None] + spans
+                inside = columns < np.ceil((left + ENEMY_WIDTH) / size)[:, None]
+                # Grid column 0 and width - 1 are the default column
+                index = np.clip(columns - (self.tile_origin - 1), 0, width - 1).astype(np.intp)
+                index += (np.clip(row, 0, rows - 1).astype(np.intp) * width)[:, None]
+                hit = (inside & flat[index]).any(axis=1) & pending & (row >= 0)
+                landing_y[hit] = row[hit] * size - ENEMY_HEIGHT
+                pending &= ~hit
+                row = row + 1
+        return landing_y
+
+    def overlapping(self, x, y, width, height):
+        """Indices of enemies whose box overlaps the given rectangle"""
+        hits = ((x < self.x + ENEMY_WIDTH) &
+                (x + width > self.x) &
+                (y < self.y + ENEMY_HEIGHT) &
+                (y + height > self.y))
+        return np.flatnonzero(hits)
+
+    def strike(self, x, y, width, height, frame, cooldown):
+        """Indices of overlapping enemies whose damage cooldown is over
+
+        Their cooldown restarts, so they won't hit again before frame + cooldown.
+        """
+        hits = self.overlapping(x, y, width, height)
+        hits = hits[self.next_hit_frame[hits] <= frame]
+        self.next_hit_frame[hits] = frame + cooldown
+        return hits
+
+    def visible(self, left, right):
+        """EnemyView handles for enemies whose box touches [left, right)"""
+        hits = (self.x > left - ENEMY_WIDTH) & (self.x < right)
+        return [EnemyView(self, int(i)) for i in np.flatnonzero(hits)]
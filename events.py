@@ -0,0 +1,50 @@
+"""Gameplay events and the bus that hands them to subscribers in batches.
+
+World.step() only detects what happened and publishes one event per
+occurrence; sounds, the HUD and telemetry react to events instead of being
+called from inside the simulation. Events wait on the bus until its owner
+calls dispatch() (main.py does once per rendered frame, after all of that
+frame's ticks), and each subscriber then gets a single list with every
+queued event of the types it asked for:
+
+    world.bus.subscribe(play_sounds, Jumped, CoinCollected, HeroDamaged)
+    world.bus.subscribe(telemetry.record)  # no types: every event
+    ...
+    world.bus.dispatch()
+"""
+from collections import namedtuple
+
+Jumped = namedtuple("Jumped", ["frame", "x", "y"])
+CoinCollected = namedtuple("CoinCollected", ["frame", "x", "y", "score"])
+HeroDamaged = namedtuple("HeroDamaged", ["frame", "amount", "health", "enemy_type"])
+Victory = namedtuple("Victory", ["frame", "score"])
+GameOver = namedtuple("GameOver", ["frame", "score"])
+
+class EventBus:
+    def __init__(self):
+        self.queue = []
+        self.subscribers = []  # (handler, set of event types or None for all)
+
+    def subscribe(self, handler, *types):
+        """Call handler(events) on dispatch with the queued events of `types`"""
+        self.subscribers.append((handler, frozenset(types) or None))
+
+    def unsubscribe(self, handler):
+        self.subscribers = [(h, types) for h, types in self.subscribers if h != handler]
+
+    def publish(self, event):
+        self.queue.append(event)
+
+    def dispatch(self):
+        """Deliver everything published since the last dispatch"""
+        queue = self.queue
+        if not queue:
+            return
+        self.queue = []
+        for handler, types in self.subscribers:
+            batch = queue if types is None else [event for event in queue if type(event) in types]
+            if batch:
+                handler(batch)
+
+    def clear(self):
+        self.queue.clear()
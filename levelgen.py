@@ -0,0 +1,253 @@
+"""Seeded procedural levels of any length, generated one chunk at a time.
+
+GeneratedLevel grows the level 1 pattern (platforms at staggered heights,
+enemies on the ground between them, coins above the platforms) to any
+width. It has the same interface as levels.LevelData and
+levels.BinaryLevel (width, hero, chunk_width, chunk_count, load_chunk), so
+a World streams it like any other level, but a chunk only exists while
+load_chunk builds it. Every chunk comes from its own seed-derived random
+generator, so it can be rebuilt on its own and a billion-pixel level costs
+nothing until it is played.
+
+Every level can be completed under the world.py jump arc (JUMP_STRENGTH,
+GRAVITY, PLAYER_SPEED) in effect when the level is created:
+
+* the ground runs the whole width, with no holes, and no platform hangs
+  low enough to block it;
+* each enemy stands in its own "jump corridor": room to take off, the
+  whole patrol area, and the enemy's attack range behind it. Corridors
+  never overlap, and platforms over them sit above the peak of the jump
+  so they cannot cut it short;
+* every platform can be reached, from the ground or from the platform
+  before it, and every coin sits just above a platform.
+
+Platforms are aligned to the tile grid (tilemap.TILE_SIZE), so the tiles
+the World builds from them are exactly the rectangles checked here.
+
+    python levelgen.py --width 1000000 --seed 7 --check --output levels/huge.lvl
+"""
+import argparse
+import random
+import sys
+from array import array
+
+import levels
+import world as _world
+from tilemap import TILE_SIZE
+
+PLATFORM_HEIGHT = 20
+PLATFORM_WIDTHS = (100, 180)
+PLATFORM_GAP = 20  # Minimum gap between two platforms
+TOP_Y = 200  # Highest platform top
+LOWEST_Y = 440  # Lowest platform top; the hero still walks under it
+HERO_START = (50, 450)
+SAFE_START = 300  # No jump corridor starts closer to the left edge
+REACH_MARGIN = 0.85  # Fraction of the jump arc the layout may rely on
+ENEMY_PATROL = 50  # Must match Enemy.patrol_start/patrol_end
+ENEMY_ATTACK_RANGE = 100  # Must match Enemy.think
+HERO_SIZE = 32
+ENEMY_SIZE = 24
+
+def jump_arc(jump_strength=None, gravity=None, speed=None):
+    """(height, distance) of a running jump from flat ground, tick by tick
+
+    Uses the same integration as Hero.update: gravity is added before the
+    move. Distance is how far the hero runs while airborne.
+    """
+    vel_y = _world.JUMP_STRENGTH if jump_strength is None else jump_strength
+    gravity = _world.GRAVITY if gravity is None else gravity
+    speed = _world.PLAYER_SPEED if speed is None else speed
+    y = height = 0.0
+    ticks = 0
+    while True:
+        vel_y += gravity
+        y += vel_y
+        ticks += 1
+        if y >= 0:
+            break
+        height = max(height, -y)
+    return height, ticks * speed
+
+def jump_corridor(distance):
+    """(before, after): ground around an enemy's x that its jump needs clear"""
+    return (int(distance) + ENEMY_PATROL + HERO_SIZE,
+            ENEMY_SIZE + ENEMY_PATROL + ENEMY_ATTACK_RANGE)
+
+def stochastic_round(rng, value):
+    whole = int(value)
+    return whole + (rng.random() < value - whole)
+
+class GeneratedLevel:
+    """A procedural level; chunks are generated on demand and not kept
+
+    Densities are per 1000 px of level: platform_density platforms and
+    enemy_density enemies (a strong_ratio share of them "strong");
+    coin_density is the chance that a platform carries a coin. Enemy
+    density is capped by the room each jump corridor needs.
+    """
+
+    def __init__(self, seed, width, chunk_width=levels.DEFAULT_CHUNK_WIDTH,
+                 platform_density=5, enemy_density=1, coin_density=1.0, strong_ratio=1 / 3):
+        self.seed = seed
+        self.width = width
+        self.hero = HERO_START
+        self.chunk_width = chunk_width
+        self.platform_density = platform_density
+        self.enemy_density = enemy_density
+        self.coin_density = coin_density
+        self.strong_ratio = strong_ratio
+
+        height, distance = jump_arc()
+        feet = _world.GROUND_Y  # Hero's feet standing on the ground
+        self.ground_reach = max(TOP_Y, int(feet - height * REACH_MARGIN))
+        if self.ground_reach > LOWEST_Y:
+            raise ValueError(f"a {height:.0f} px jump cannot reach any platform")
+        self.max_rise = int(height * REACH_MARGIN)
+        self.max_gap = int(distance * REACH_MARGIN)
+        self.corridor = jump_corridor(distance)
+        # Lowest platform top that stays clear of a ground jump's peak
+        self.corridor_lowest = int(feet - HERO_SIZE - height) - PLATFORM_HEIGHT
+
+    @property
+    def chunk_count(self):
+        return -(-self.width // self.chunk_width)
+
+    def rng(self, index, kind):
+        # Separate streams per chunk and entity kind, so changing the coin
+        # density does not move the platforms
+        return random.Random(f"{self.seed}:{index}:{kind}")
+
+    def load_chunk(self, index):
+        left = index * self.chunk_width
+        right = min(left + self.chunk_width, self.width)
+        corridors, enemies = self._enemies(index, left, right)
+        platforms, coins = self._platforms_and_coins(index, left, right, corridors)
+        return levels.LevelChunk(platforms, enemies, coins, array("i"))
+
+    def _enemies(self, index, left, right):
+        """Jump corridors [(start, end)] and enemies of a chunk
+
+        Corridors stay inside the chunk, so the chunks never depend on
+        their neighbours.
+        """
+        before, after = self.corridor
+        size = before + after
+        start = max(left, SAFE_START)
+        room = right - start
+        rng = self.rng(index, "enemies")
+        count = min(stochastic_round(rng, self.enemy_density * (right - left) / 1000),
+                    max(0, room // size))
+        # Spread the spare room randomly between the corridors
+        cuts = sorted(rng.randint(0, room - count * size) for _ in range(count))
+        corridors = []
+        enemies = array("i")
+        for i, cut in enumerate(cuts):
+            x = start + cut + i * size
+            corridors.append((x, x + size))
+            kind = 1 if rng.random() < self.strong_ratio else 0
+            enemies.extend((x + before, _world.GROUND_Y - ENEMY_SIZE, kind))
+        return corridors, enemies
+
+    def _platforms_and_coins(self, index, left, right, corridors):
+        platforms = array("i")
+        coins = array("i")
+        right = min(right, self.width - 50)
+        rng = self.rng(index, "platforms")
+        coin_rng = self.rng(index, "coins")
+        count = min(stochastic_round(rng, self.platform_density * (right - left) / 1000),
+                    max(0, right - left) // (PLATFORM_WIDTHS[1] + PLATFORM_GAP))
+        if count <= 0:
+            return platforms, coins
+        slot = (right - left) / count
+        prev = None  # (right edge, top) of the previous platform in this chunk
+        for i in range(count):
+            width = rng.randint(*PLATFORM_WIDTHS) // TILE_SIZE * TILE_SIZE
+            x = int(left + i * slot + rng.uniform(0, slot - width - PLATFORM_GAP))
+            x -= x % TILE_SIZE
+            # Reachable from the ground, or a bounded climb from the last one
+            highest = self.ground_reach
+            if prev is not None and x - prev[0] <= self.max_gap:
+                highest = min(highest, prev[1] - self.max_rise)
+            # Over a jump corridor, only above the peak of the jump
+            lowest = LOWEST_Y
+            if any(x < end and x + width > start for start, end in corridors):
+                lowest = self.corridor_lowest
+            top, bottom = -(-max(TOP_Y, highest) // TILE_SIZE), lowest // TILE_SIZE
+            if top > bottom:
+                continue
+            y = rng.randint(top, bottom) * TILE_SIZE
+            platforms.extend((x, y, width, PLATFORM_HEIGHT))
+            if coin_rng.random() < self.coin_density:
+                coins.extend((x + width // 3, y - 20))
+            prev = (x + width, y)
+        return platforms, coins
+
+def check(level):
+    """Raise ValueError where a level breaks the rules GeneratedLevel follows
+
+    Works on any level, so it also tells whether a hand-made one can be
+    completed without taking damage.
+    """
+    height, distance = jump_arc()
+    feet = _world.GROUND_Y
+    ceiling = feet - HERO_SIZE - height  # Hero's top at the peak of a ground jump
+    before, after = jump_corridor(distance)
+    last_corridor = None
+    previous = array("i")  # Platforms of the previous chunk, for corridors across the edge
+    chunk = level.load_chunk(0) if level.chunk_count else None
+    for index in range(level.chunk_count):
+        following = level.load_chunk(index + 1) if index + 1 < level.chunk_count else None
+        h = chunk.holes
+        for i in range(0, len(h), 2):
+            if h[i + 1] > distance:
+                raise ValueError(f"hole at x={h[i]} is too wide to jump")
+        p = chunk.platforms
+        prev = None
+        for i in range(0, len(p), 4):
+            x, y, width, height_ = p[i:i + 4]
+            if y + height_ > feet - HERO_SIZE:
+                raise ValueError(f"platform at x={x} blocks the ground")
+            from_ground = y >= feet - height
+            from_prev = prev is not None and x - prev[0] <= distance and prev[1] - y <= height
+            if not (from_ground or from_prev):
+                raise ValueError(f"platform at x={x}, y={y} cannot be reached")
+            prev = (x + width, y)
+
+        nearby = previous + p + (following.platforms if following else array("i"))
+        e = chunk.enemies
+        for i in range(0, len(e), 3):
+            start, end = e[i] - before, e[i] + after
+            if last_corridor is not None and start < last_corridor:
+                raise ValueError(f"enemy at x={e[i]} is too close to the one before to jump")
+            for j in range(0, len(nearby), 4):
+                x, y, width, height_ = nearby[j:j + 4]
+                if x < end and x + width > start and y + height_ > ceiling:
+                    raise ValueError(f"platform at x={x} cuts the jump over the enemy at x={e[i]}")
+            last_corridor = end
+        previous = p
+        chunk = following
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera fases procedurais para testes de carga")
+    parser.add_argument("--width", type=int, required=True, help="largura da fase em pixels")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-width", type=int, default=levels.DEFAULT_CHUNK_WIDTH)
+    parser.add_argument("--platforms", type=float, default=5, help="plataformas a cada 1000 px")
+    parser.add_argument("--enemies", type=float, default=1, help="inimigos a cada 1000 px")
+    parser.add_argument("--coins", type=float, default=1.0, help="chance de moeda por plataforma")
+    parser.add_argument("--strong", type=float, default=1 / 3, help="fração de inimigos fortes")
+    parser.add_argument("--check", action="store_true", help="confere se a fase pode ser completada")
+    parser.add_argument("--output", help="grava a fase em formato .lvl")
+    args = parser.parse_args(argv)
+
+    level = GeneratedLevel(args.seed, args.width, args.chunk_width, args.platforms,
+                           args.enemies, args.coins, args.strong)
+    if args.check:
+        check(level)
+        print(f"{level.chunk_count} blocos conferidos", file=sys.stderr)
+    if args.output:
+        levels.write_binary(level, args.output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
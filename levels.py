@@ -0,0 +1,197 @@
+"""Level files and chunked level data.
+
+Levels are authored as JSON in levels/levelN.json:
+
+    {"width": 2000, "hero": [50, 450], "chunk_width": 1000,
+     "platforms": [[x, y, width, height], ...],
+     "enemies": [[x, y, "basic" | "strong"], ...],
+     "coins": [[x, y], ...],
+     "holes": [[x, width], ...]}
+
+The ground runs the whole width of the level except where "holes" cut it
+(optional; falling into one ends the run).
+
+and can be compiled to a compact binary .lvl file for shipping:
+
+    python levels.py compile levels/level1.json levels/level1.lvl
+
+Both forms split the world into x-chunks of chunk_width pixels (an entity
+belongs to the chunk containing its left edge). Entities are kept as flat
+int arrays, never as game objects; the World turns a chunk into tiles
+(see tilemap.py) and Enemy and Coin objects only while it is near the
+camera. A .lvl file is read one chunk at a time, so huge levels never have
+to fit in memory. Platforms must be narrower than a chunk; holes are split
+at chunk edges so each chunk knows its own ground.
+"""
+import json
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
+DEFAULT_CHUNK_WIDTH = 1000
+ENEMY_TYPES = ("basic", "strong")
+
+MAGIC = b"PLVL"
+VERSION = 2
+HEADER = struct.Struct("<4sHIIIii")  # magic, version, width, chunk_width, chunk count, hero x, hero y
+CHUNK_ENTRY = struct.Struct("<IIIII")  # offset, platforms, enemies, coins, holes
+
+# Flat int32 arrays: platforms (x, y, w, h)*, enemies (x, y, type)*, coins (x, y)*,
+# holes in the ground (x, width)*
+LevelChunk = namedtuple("LevelChunk", ["platforms", "enemies", "coins", "holes"])
+# int32s per entry of each LevelChunk field
+FIELD_SIZES = (4, 3, 2, 2)
+
+def empty_chunk():
+    return LevelChunk(array("i"), array("i"), array("i"), array("i"))
+
+class LevelData:
+    """A level held in memory as per-chunk int arrays"""
+
+    def __init__(self, width, hero, chunk_width=DEFAULT_CHUNK_WIDTH, chunks=None):
+        self.width = width
+        self.hero = tuple(hero)
+        self.chunk_width = chunk_width
+        self.chunks = chunks if chunks is not None else [
+            empty_chunk() for _ in range(-(-width // chunk_width))]
+
+    @property
+    def chunk_count(self):
+        return len(self.chunks)
+
+    def load_chunk(self, index):
+        return self.chunks[index]
+
+    def _chunk_for(self, x):
+        return min(max(int(x // self.chunk_width), 0), len(self.chunks) - 1)
+
+    def add_platform(self, x, y, width, height):
+        self.chunks[self._chunk_for(x)].platforms.extend((x, y, width, height))
+
+    def add_enemy(self, x, y, enemy_type="basic"):
+        self.chunks[self._chunk_for(x)].enemies.extend((x, y, ENEMY_TYPES.index(enemy_type)))
+
+    def add_coin(self, x, y):
+        self.chunks[self._chunk_for(x)].coins.extend((x, y))
+
+    def add_hole(self, x, width):
+        """Cut the ground from x to x + width, one piece per chunk it crosses"""
+        end = min(x + width, self.width)
+        x = max(x, 0)
+        while x < end:
+            index = self._chunk_for(x)
+            piece = min(end, (index + 1) * self.chunk_width) - x
+            self.chunks[index].holes.extend((x, piece))
+            x += piece
+
+    @classmethod
+    def from_dict(cls, data):
+        level = cls(data["width"], data["hero"], data.get("chunk_width", DEFAULT_CHUNK_WIDTH))
+        for x, y, width, height in data.get("platforms", ()):
+            level.add_platform(x, y, width, height)
+        for x, y, enemy_type in data.get("enemies", ()):
+            level.add_enemy(x, y, enemy_type)
+        for x, y in data.get("coins", ()):
+            level.add_coin(x, y)
+        for x, width in data.get("holes", ()):
+            level.add_hole(x, width)
+        return level
+
+    @classmethod
+    def load_json(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def save_binary(self, path):
+        """Write the compact .lvl form"""
+        write_binary(self, path)
+
+class BinaryLevel:
+    """A compiled .lvl file; chunks are read from disk on demand"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            magic, version, self.width, self.chunk_width, count, hero_x, hero_y = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path}: not a version {VERSION} level file")
+            table = f.read(CHUNK_ENTRY.size * count)
+        self.hero = (hero_x, hero_y)
+        self.table = [CHUNK_ENTRY.unpack_from(table, i * CHUNK_ENTRY.size) for i in range(count)]
+
+    @property
+    def chunk_count(self):
+        return len(self.table)
+
+    def load_chunk(self, index):
+        offset, *counts = self.table[index]
+        sizes = [count * size for count, size in zip(counts, FIELD_SIZES)]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(4 * sum(sizes))
+        parts = []
+        start = 0
+        for size in sizes:
+            values = array("i")
+            values.frombytes(data[start * 4:(start + size) * 4])
+            if sys.byteorder != "little":
+                values.byteswap()
+            parts.append(values)
+            start += size
+        return LevelChunk(*parts)
+
+def write_binary(level, path):
+    """Write any level (width, hero, chunk_width, chunk_count, load_chunk) as .lvl
+
+    Chunks are loaded and written one at a time; the chunk table is filled
+    in at the end, so generated levels never have to be held in memory.
+    """
+    count = level.chunk_count
+    table = []
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, level.width, level.chunk_width, count, *level.hero))
+        f.write(bytes(CHUNK_ENTRY.size * count))
+        for index in range(count):
+            chunk = level.load_chunk(index)
+            table.append(CHUNK_ENTRY.pack(f.tell(), *(len(values) // size for values, size
+                                                      in zip(chunk, FIELD_SIZES))))
+            for values in chunk:
+                f.write(little_endian(values))
+        f.seek(HEADER.size)
+        f.write(b"".join(table))
+
+def little_endian(values):
+    if sys.byteorder != "little":
+        values = array("i", values)
+        values.byteswap()
+    return values.tobytes()
+
+def level_path(number, directory=LEVEL_DIR):
+    """Path of level `number`, preferring the compiled form; None if missing"""
+    for ext in (".lvl", ".json"):
+        path = os.path.join(directory, f"level{number}{ext}")
+        if os.path.exists(path):
+            return path
+    return None
+
+def load_level(number, directory=LEVEL_DIR):
+    path = level_path(number, directory)
+    if path is None:
+        raise FileNotFoundError(f"level {number} not found in {directory}")
+    if path.endswith(".lvl"):
+        return BinaryLevel(path)
+    return LevelData.load_json(path)
+
+def main(argv):
+    if len(argv) != 4 or argv[1] != "compile":
+        print("uso: python levels.py compile <fase.json> <fase.lvl>")
+        return 2
+    LevelData.load_json(argv[2]).save_binary(argv[3])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,277 @@
+"""Bulk automated playthroughs across worker processes, for tuning.
+
+Each episode plays one level in its own headless World with an input
+policy and a set of overrides, and reports how it ended:
+
+    {"config": {...}, "policy": "random", "seed": 7, "outcome": "victory",
+     "frames": 812, "score": 50, "coins": 5, "hits": 1, "damage": 20}
+
+Overrides are world.py constants (GRAVITY, JUMP_STRENGTH, ENEMY_SPEED, ...)
+plus two level options: "level" (a level number or a .json/.lvl path) and
+"enemy_shift" (pixels added to every enemy's x). Episodes are sent to a
+ProcessPoolExecutor in batches; each result is printed (or written as JSON
+Lines) as soon as its batch returns, and a per-configuration summary is
+printed at the end:
+
+    python playtest.py --episodes 500 --policy random --sweep ENEMY_SPEED=1,2,3
+    python playtest.py --set GRAVITY=0.9 --set JUMP_STRENGTH=-14 --output runs.jsonl
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import levels
+import world as _world
+from events import HeroDamaged
+from world import World, Inputs, PLAYING, VICTORY
+
+MAX_FRAMES = 5000
+# world.py constants an episode may override
+TUNABLE = ("GRAVITY", "JUMP_STRENGTH", "PLAYER_SPEED", "ENEMY_SPEED",
+           "ACTIVE_RADIUS", "SLEEP_INTERVAL", "ACTIVITY_REFRESH",
+           "THINK_INTERVAL", "THINK_BUDGET", "ENEMY_DAMAGE", "DAMAGE_COOLDOWN")
+LEVEL_OPTIONS = ("level", "enemy_shift")
+
+# Policies are looked up by name in the worker, so episodes stay picklable.
+# Each factory takes the episode's random.Random and returns world -> Inputs.
+def scripted_policy(rng):
+    """Run right and jump on a fixed beat"""
+    return lambda world: Inputs(right=True, jump=world.frame % 45 == 0)
+
+def random_policy(rng):
+    """Mostly run right; jump and back off at random, holding each choice a while"""
+    state = {"inputs": Inputs(), "hold": 0}
+
+    def policy(world):
+        if state["hold"] <= 0:
+            state["inputs"] = Inputs(left=rng.random() < 0.15, right=rng.random() < 0.8,
+                                     jump=rng.random() < 0.3)
+            state["hold"] = rng.randint(5, 30)
+        state["hold"] -= 1
+        return state["inputs"]
+    return policy
+
+def jumper_policy(rng):
+    """Run right and jump when an enemy is close ahead"""
+    def policy(world):
+        hero = world.hero
+        ahead = any(0 < x - hero.x < 90 and abs(y - hero.y) < 80
+                    for x, y in world.enemy_positions())
+        return Inputs(right=True, jump=ahead)
+    return policy
+
+POLICIES = {
+    "scripted": scripted_policy,
+    "random": random_policy,
+    "jumper": jumper_policy,
+}
+
+@contextmanager
+def overridden(constants):
+    """Temporarily replace world.py module constants"""
+    saved = {}
+    try:
+        for name, value in constants.items():
+            if name not in TUNABLE:
+                raise ValueError(f"{name} is not a tunable world constant")
+            saved[name] = getattr(_world, name)
+            setattr(_world, name, value)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(_world, name, value)
+
+def shifted_level(level, dx):
+    """Copy of `level` with every enemy moved dx pixels along x"""
+    moved = levels.LevelData(level.width, level.hero, level.chunk_width)
+    for index in range(level.chunk_count):
+        chunk = level.load_chunk(index)
+        p = chunk.platforms
+        for i in range(0, len(p), 4):
+            moved.add_platform(p[i], p[i + 1], p[i + 2], p[i + 3])
+        e = chunk.enemies
+        for i in range(0, len(e), 3):
+            moved.add_enemy(min(max(int(e[i] + dx), 0), level.width - 1), e[i + 1],
+                            levels.ENEMY_TYPES[e[i + 2]])
+        c = chunk.coins
+        for i in range(0, len(c), 2):
+            moved.add_coin(c[i], c[i + 1])
+        h = chunk.holes
+        for i in range(0, len(h), 2):
+            moved.add_hole(h[i], h[i + 1])
+    return moved
+
+# Per-worker cache so a batch loads each level variant once
+_level_cache = {}
+
+def episode_level(level, enemy_shift):
+    key = (level, enemy_shift)
+    if key not in _level_cache:
+        if isinstance(level, str):
+            data = levels.BinaryLevel(level) if level.endswith(".lvl") else levels.LevelData.load_json(level)
+        else:
+            data = levels.load_level(level)
+        _level_cache[key] = shifted_level(data, enemy_shift) if enemy_shift else data
+    return _level_cache[key]
+
+def run_episode(config, policy, seed, max_frames=MAX_FRAMES):
+    """Play one episode and return its outcome stats"""
+    constants = {k: v for k, v in config.items() if k not in LEVEL_OPTIONS}
+    level = config.get("level", 1)
+    with overridden(constants):
+        # Constructor defaults were bound at import; pass the overridden ones
+        world = World(seed=seed, active_radius=_world.ACTIVE_RADIUS,
+                      sleep_interval=_world.SLEEP_INTERVAL,
+                      think_interval=_world.THINK_INTERVAL, think_budget=_world.THINK_BUDGET)
+        world.start(level if isinstance(level, int) else 1,
+                    level_data=episode_level(level, config.get("enemy_shift", 0)))
+        play = POLICIES[policy](random.Random(seed))
+        hits = []
+        world.bus.subscribe(hits.extend, HeroDamaged)
+        frames = 0
+        while world.game_state == PLAYING and frames < max_frames:
+            world.step(play(world))
+            frames += 1
+        world.bus.dispatch()
+    if world.game_state == VICTORY:
+        outcome = "victory"
+    elif world.game_state == PLAYING:
+        outcome = "timeout"
+    else:
+        outcome = "game_over"
+    return {"config": config, "policy": policy, "seed": seed, "outcome": outcome,
+            "frames": frames, "score": world.score, "coins": world.coins_collected,
+            "hits": len(hits), "damage": world.hero.max_health - world.hero.health,
+            "ai_evaluations": world.ai.total}
+
+def run_batch(episodes, max_frames=MAX_FRAMES):
+    return [run_episode(config, policy, seed, max_frames) for config, policy, seed in episodes]
+
+def batched(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def run_parallel(episodes, workers=None, batch_size=None, max_frames=MAX_FRAMES):
+    """Yield episode results as they finish, in completion order
+
+    `episodes` is a list of (config, policy, seed). Episodes are grouped in
+    batches so the per-task pickling overhead stays small next to the work.
+    """
+    workers = workers or os.cpu_count() or 1
+    if batch_size is None:
+        batch_size = max(1, len(episodes) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_batch, batch, max_frames)
+                   for batch in batched(episodes, batch_size)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+class Report:
+    """Running aggregate of episode results, grouped by config and policy"""
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, result):
+        key = (json.dumps(result["config"], sort_keys=True), result["policy"])
+        group = self.groups.setdefault(key, {"episodes": 0, "victory": 0, "game_over": 0,
+                                             "timeout": 0, "frames": 0, "score": 0, "damage": 0})
+        group["episodes"] += 1
+        group[result["outcome"]] += 1
+        for field in ("frames", "score", "damage"):
+            group[field] += result[field]
+
+    def summary(self):
+        rows = []
+        for (config, policy), group in sorted(self.groups.items()):
+            n = group["episodes"]
+            rows.append({"config": json.loads(config), "policy": policy, "episodes": n,
+                         "victory_rate": group["victory"] / n,
+                         "game_over_rate": group["game_over"] / n,
+                         "timeout_rate": group["timeout"] / n,
+                         "mean_frames": group["frames"] / n,
+                         "mean_score": group["score"] / n,
+                         "mean_damage": group["damage"] / n})
+        return rows
+
+def parse_value(text):
+    if text == "None":
+        return None  # ACTIVE_RADIUS and THINK_BUDGET use it for "no limit"
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+def parse_assignment(text):
+    name, _, value = text.partition("=")
+    if not value:
+        raise argparse.ArgumentTypeError(f"esperado NOME=VALOR, recebido {text!r}")
+    return name, value
+
+def configurations(fixed, sweeps):
+    """Every combination of the swept values on top of the fixed overrides"""
+    names = [name for name, _ in sweeps]
+    for values in itertools.product(*(values for _, values in sweeps)):
+        config = dict(fixed)
+        config.update(zip(names, values))
+        yield config
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partidas automáticas em paralelo")
+    parser.add_argument("--episodes", type=int, default=100, help="partidas por configuração")
+    parser.add_argument("--policy", nargs="+", default=["scripted"], choices=list(POLICIES))
+    parser.add_argument("--set", type=parse_assignment, action="append", default=[],
+                        metavar="NOME=VALOR", help="constante de world.py, level ou enemy_shift")
+    parser.add_argument("--sweep", type=parse_assignment, action="append", default=[],
+                        metavar="NOME=V1,V2,...", help="testa cada valor (combinações de todos)")
+    parser.add_argument("--workers", type=int, help="processos (padrão: número de núcleos)")
+    parser.add_argument("--max-frames", type=int, default=MAX_FRAMES)
+    parser.add_argument("--output", help="grava cada partida em JSON Lines")
+    parser.add_argument("--seed", type=int, default=0, help="semente da primeira partida")
+    args = parser.parse_args(argv)
+
+    allowed = TUNABLE + LEVEL_OPTIONS
+    for name, _ in args.set + args.sweep:
+        if name not in allowed:
+            parser.error(f"{name} não pode ser alterado; opções: {', '.join(allowed)}")
+    fixed = {name: parse_value(value) for name, value in args.set}
+    sweeps = [(name, [parse_value(v) for v in values.split(",")]) for name, values in args.sweep]
+
+    episodes = [(config, policy, args.seed + i)
+                for config in configurations(fixed, sweeps)
+                for policy in args.policy
+                for i in range(args.episodes)]
+    report = Report()
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for done, result in enumerate(run_parallel(episodes, args.workers,
+                                                   max_frames=args.max_frames), 1):
+            report.add(result)
+            out.write(json.dumps(result) + "\n")
+            if out is not sys.stdout and sys.stderr.isatty():
+                print(f"\r{done}/{len(episodes)} partidas", end="", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+            if sys.stderr.isatty():
+                print(file=sys.stderr)
+
+    for row in report.summary():
+        print(f"{json.dumps(row['config'], sort_keys=True)} {row['policy']:>9}: "
+              f"{row['episodes']} partidas, vitória {row['victory_rate']:.0%}, "
+              f"game over {row['game_over_rate']:.0%}, frames {row['mean_frames']:.0f}, "
+              f"pontos {row['mean_score']:.1f}, dano {row['mean_damage']:.1f}",
+              file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
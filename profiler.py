@@ -0,0 +1,149 @@
+"""Per-frame phase timing with a rolling percentile overlay and file export.
+
+A frame is split into named phases. Code calls start() where timing should
+resume and mark(phase) at the end of each phase; the time since the last
+start()/mark() is added to that phase. end_frame() closes the frame, pushes
+the timings into rolling windows and, if a log is open, writes one row.
+
+Logs are CSV or JSON Lines depending on the file extension:
+
+    frame,interval_ms,work_ms,hero,enemies,...
+    {"frame": 1, "interval_ms": 16.7, "work_ms": 3.1, "hero": 0.02, ...}
+
+Only draw_overlay() needs pygame/pgzero; the timing itself is headless.
+"""
+import csv
+import json
+from collections import deque
+from time import perf_counter
+
+# Phases in frame order; update phases first, then draw passes
+PHASES = ("hero", "enemies", "coins", "camera", "collisions",
+          "draw_cull", "draw_background", "draw_sprites", "draw_hud")
+BUDGET_MS = 1000 / 60
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[int(fraction * (len(sorted_values) - 1))]
+
+class Profiler:
+    def __init__(self, window=300):
+        self.window = window
+        self.samples = {phase: deque(maxlen=window) for phase in PHASES}
+        self.work_times = deque(maxlen=window)  # Sum of all phases
+        self.intervals = deque(maxlen=window)  # Time between frame starts (1/FPS)
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.frame = 0
+        self.in_frame = False
+        self._last = 0.0
+        self._frame_start = None
+        self._log = None
+        self._writer = None
+        self._panel = None
+
+    def begin_frame(self):
+        now = perf_counter()
+        if self._frame_start is not None:
+            self.intervals.append(now - self._frame_start)
+        self._frame_start = now
+        self._last = now
+        self.in_frame = True
+
+    def start(self):
+        """Resume timing; time since the last mark is not attributed"""
+        self._last = perf_counter()
+
+    def mark(self, phase):
+        now = perf_counter()
+        self.current[phase] += now - self._last
+        self._last = now
+
+    def end_frame(self):
+        if not self.in_frame:
+            return
+        self.in_frame = False
+        self.frame += 1
+        current = self.current
+        work = 0.0
+        for phase in PHASES:
+            self.samples[phase].append(current[phase])
+            work += current[phase]
+        self.work_times.append(work)
+        if self._log is not None:
+            self._write_row(current, work)
+        for phase in PHASES:
+            current[phase] = 0.0
+
+    def stats(self, values):
+        """(p50, p95, p99) in milliseconds of a window of seconds"""
+        ordered = sorted(values)
+        return tuple(percentile(ordered, f) * 1000 for f in (0.50, 0.95, 0.99))
+
+    def fps(self):
+        if not self.intervals:
+            return 0.0
+        return len(self.intervals) / sum(self.intervals)
+
+    def open_log(self, path):
+        """Start writing per-frame timings to a .csv or .jsonl file"""
+        self.close_log()
+        self._log = open(path, "w", newline="", encoding="utf-8")
+        if path.endswith(".csv"):
+            self._writer = csv.writer(self._log)
+            self._writer.writerow(("frame", "interval_ms", "work_ms") + PHASES)
+        else:
+            self._writer = None
+
+    def close_log(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+            self._writer = None
+
+    def _write_row(self, current, work):
+        interval = self.intervals[-1] * 1000 if self.intervals else 0.0
+        values = [round(current[phase] * 1000, 4) for phase in PHASES]
+        if self._writer is not None:
+            self._writer.writerow([self.frame, round(interval, 4), round(work * 1000, 4)] + values)
+        else:
+            row = {"frame": self.frame, "interval_ms": round(interval, 4),
+                   "work_ms": round(work * 1000, 4)}
+            row.update(zip(PHASES, values))
+            self._log.write(json.dumps(row) + "\n")
+
+    def draw_overlay(self, screen, x=600, y=10):
+        """Percentile table and frame-time graph on a pgzero screen"""
+        import pygame
+
+        width, graph_height = 390, 60
+        line = 14
+        if self._panel is None:
+            self._panel = pygame.Surface((width, graph_height + line * (len(PHASES) + 3) + 10),
+                                         pygame.SRCALPHA)
+            self._panel.fill((0, 0, 0, 160))
+        screen.blit(self._panel, (x, y))
+
+        white = (255, 255, 255)
+        p50, p95, p99 = self.stats(self.work_times)
+        screen.draw.text(f"FPS {self.fps():5.1f}   trabalho p50 {p50:5.2f}  p95 {p95:5.2f}  p99 {p99:5.2f} ms",
+                         (x + 5, y + 5), fontsize=14, color=white)
+        screen.draw.text(f"{'fase':<16}{'p50':>8}{'p95':>8}{'p99':>8}",
+                         (x + 5, y + 5 + line), fontsize=14, color=white)
+        for i, phase in enumerate(PHASES):
+            p50, p95, p99 = self.stats(self.samples[phase])
+            screen.draw.text(f"{phase:<16}{p50:8.3f}{p95:8.3f}{p99:8.3f}",
+                             (x + 5, y + 5 + line * (i + 2)), fontsize=14, color=white)
+
+        # Frame interval graph, scaled so the 60 fps budget sits mid-height
+        top = y + 10 + line * (len(PHASES) + 2)
+        bottom = top + graph_height
+        scale = graph_height / (2 * BUDGET_MS)
+        budget_y = bottom - BUDGET_MS * scale
+        pygame.draw.line(screen.surface, (255, 80, 80), (x + 5, budget_y), (x + width - 5, budget_y))
+        intervals = list(self.intervals)
+        if len(intervals) > 1:
+            step = (width - 10) / (self.window - 1)
+            points = [(x + 5 + i * step, max(top, bottom - seconds * 1000 * scale))
+                      for i, seconds in enumerate(intervals)]
+            pygame.draw.lines(screen.surface, (80, 255, 80), False, points)
@@ -0,0 +1,346 @@
+"""Drawing of a World onto a pgzero screen."""
+import math
+
+import pygame
+from pygame import Rect
+from pgzero import ptext
+
+from sprites import SpriteAtlas
+from tilemap import GROUND
+from world import WIDTH, HEIGHT
+
+TEXTURE_TILE = 16
+STRIP_WIDTH = 1024  # Width of the pre-rendered static layer strips
+MAX_STRIPS = 4  # Strips kept before the ones off screen are dropped
+
+SKY_COLOR = (135, 206, 235)  # Sky blue
+GROUND_COLOR = (34, 139, 34)  # Forest green
+HEALTH_COLOR = (255, 0, 0)
+TEXT_COLOR = (255, 255, 255)
+HIT_COLOR = (255, 80, 80)  # Health line right after the hero is hurt
+HIT_FLASH = 30  # Ticks the health line stays HIT_COLOR
+
+class PlatformSurfaceCache:
+    """Pre-rendered platform textures keyed by (width, height)
+
+    Every platform of a given size looks the same, so its fill and texture
+    grid are drawn once and then blitted. The cache is emptied whenever the
+    world builds a new level.
+    """
+
+    def __init__(self):
+        self.surfaces = {}
+        self.generation = None
+
+    def sync(self, world):
+        """Evict all surfaces if the world has loaded a different level"""
+        if world.generation != self.generation:
+            self.surfaces.clear()
+            self.generation = world.generation
+
+    def get(self, width, height):
+        surface = self.surfaces.get((width, height))
+        if surface is None:
+            surface = self.surfaces[(width, height)] = render_platform_surface(width, height)
+        return surface
+
+def render_platform_surface(width, height):
+    # The texture grid overhangs the platform by up to one tile, just like
+    # the per-tile outlines drawn directly to the screen did
+    tiles_x = -(-width // TEXTURE_TILE)
+    tiles_y = -(-height // TEXTURE_TILE)
+    surface = pygame.Surface((max(width, tiles_x * TEXTURE_TILE),
+                              max(height, tiles_y * TEXTURE_TILE)), pygame.SRCALPHA)
+    surface.fill((100, 200, 100), Rect(0, 0, width, height))  # Green
+    # Add some texture
+    for i in range(0, width, TEXTURE_TILE):
+        for j in range(0, height, TEXTURE_TILE):
+            pygame.draw.rect(surface, (80, 180, 80), Rect(i, j, TEXTURE_TILE, TEXTURE_TILE), 1)
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert_alpha()
+    return surface
+
+platform_cache = PlatformSurfaceCache()
+sprite_atlas = None
+
+def bake_sprites():
+    """Pre-render every entity frame; call once the display exists"""
+    global sprite_atlas
+    sprite_atlas = SpriteAtlas()
+    return sprite_atlas
+
+def get_sprite_atlas():
+    if sprite_atlas is None:
+        return bake_sprites()
+    return sprite_atlas
+
+class StaticLayer:
+    """Sky, ground and platforms pre-rendered into strips from world.tiles
+
+    Nothing in this layer moves, so each strip_width-wide slice of the
+    world is drawn once and then blitted at the camera offset, one or two
+    opaque blits per frame instead of the ground and every platform.
+    Ground tiles are filled and platform tiles drawn as the textured
+    rectangles they merge into, so collision and drawing read the same
+    map. Strips only cover the band from the highest tile down; the plain
+    sky above it is a fill, which is cheaper than copying pixels. Strips
+    are rebuilt when the world loads a level or streams chunks in or out,
+    and only the ones near the camera are kept.
+    """
+
+    def __init__(self, strip_width=STRIP_WIDTH):
+        self.strip_width = strip_width
+        self.strips = {}  # strip index -> Surface
+        self.key = None
+        self.top = 0  # Screen y where the strips start
+        self.sky_rect = Rect(0, 0, WIDTH, 0)
+
+    def sync(self, world, layout_version):
+        key = (world.generation, layout_version)
+        if key != self.key:
+            self.strips.clear()
+            self.key = key
+            self.top = world.tiles.top_row * world.tiles.tile_size
+            self.sky_rect.height = self.top
+
+    def strip(self, index, world):
+        surface = self.strips.get(index)
+        if surface is None:
+            surface = self.strips[index] = self.render_strip(index, world)
+        return surface
+
+    def render_strip(self, index, world):
+        left = index * self.strip_width
+        top = self.top
+        surface = pygame.Surface((self.strip_width, HEIGHT - top))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.fill(SKY_COLOR)
+        # Texture grids overhang their platform by up to a tile
+        for tile, box in world.tiles.rects(left - TEXTURE_TILE, left + self.strip_width):
+            if tile == GROUND:
+                surface.fill(GROUND_COLOR, Rect(box.x - left, box.y - top, box.width, box.height))
+            else:
+                surface.blit(platform_cache.get(box.width, box.height),
+                             (box.x - left, box.y - top))
+        return surface
+
+    def visible(self, offset):
+        """Indices of the strips covering the screen at camera offset `offset`"""
+        return range(offset // self.strip_width, (offset + WIDTH - 1) // self.strip_width + 1)
+
+    def draw(self, surface, offset, world, area=None):
+        """Draw the layer at integer camera offset `offset`, only `area` if given"""
+        top = self.top
+        if area is None:
+            surface.fill(SKY_COLOR, self.sky_rect)
+        elif area.y < top:
+            surface.fill(SKY_COLOR, area.clip(self.sky_rect))
+        blits = 0
+        for index in self.visible(offset):
+            strip = self.strip(index, world)
+            x = index * self.strip_width - offset
+            if area is None:
+                surface.blit(strip, (x, top))
+            elif area.bottom > top:
+                # Blits clip the source area and shift the destination to match
+                surface.blit(strip, area.topleft, area.move(-x, -top))
+            blits += 1
+        # Strips far behind or ahead of the camera are rebuilt if needed again
+        if len(self.strips) > MAX_STRIPS:
+            keep = self.visible(offset)
+            for index in [i for i in self.strips if i not in keep]:
+                del self.strips[index]
+        return blits
+
+class Renderer:
+    """Culls the world to the camera window and blits it in one batch
+
+    The static world (sky, ground, platforms) comes from a StaticLayer,
+    redrawn only when the world streams chunks in or out. Coins and
+    enemies are looked up in the world's own sweep-and-prune broadphases,
+    and everything visible is sent to a single Surface.blits call. `stats`
+    holds the counters for the last frame.
+
+    With dirty_rects=True, frames where the camera has not moved only
+    restore the static layer under last frame's sprites, health bar and
+    HUD instead of redrawing the whole background. `dirty` then lists the
+    screen areas that changed, for loops that call
+    pygame.display.update(rects). Anything else drawn over the game (menus,
+    overlays) must call invalidate() so the next frame is redrawn in full.
+    """
+
+    def __init__(self, dirty_rects=False):
+        self.layout_version = None
+        self.static_layer = StaticLayer()
+        self.dirty_rects = dirty_rects
+        self.offset = None  # Camera offset of the last full or partial frame
+        self.drawn = []  # Screen rects drawn over the static layer last frame
+        self.dirty = None
+        self.stats = {"blits": 0, "batches": 0, "culled": 0, "static_blits": 0}
+        # Moved in place every frame instead of allocating new ones
+        self.health_rect = Rect(0, 0, 0, 4)
+
+    def sync(self, world):
+        self.layout_version = world.layout_version
+        platform_cache.sync(world)
+        if self.static_layer.key != (world.generation, self.layout_version):
+            self.static_layer.sync(world, self.layout_version)
+            self.invalidate()
+
+    def invalidate(self):
+        """Make the next frame redraw the whole screen"""
+        self.offset = None
+
+    def draw(self, screen, world, alpha=1.0):
+        """Draw the world `alpha` of the way from its previous tick to the current one"""
+        prof = world.profiler
+        if prof:
+            prof.start()
+        self.sync(world)
+        hero = world.hero
+        # Moving things are drawn at current - (current - previous) * back,
+        # which is exactly the current position when alpha is 1
+        back = 1.0 - alpha
+        camera_x = world.camera_x - (world.camera_x - world.prev_camera_x) * back
+        left = camera_x
+        right = camera_x + WIDTH
+        atlas = get_sprite_atlas()
+        batch = []
+
+        # Coins
+        for coin in world.coin_broadphase.query(left, right):
+            if coin.x + coin.width > left:
+                batch.append((atlas.surface, (coin.x - camera_x, coin.y), atlas.coin_region(coin)))
+
+        # Enemies
+        if world.enemy_pool is not None:
+            enemies = world.enemy_pool.visible(left, right)
+            total = len(world.enemy_pool)
+        else:
+            enemies = world.enemy_broadphase.query(left, right)
+            total = len(world.enemies)
+        for enemy in enemies:
+            # Broadphase candidates may lie up to its slack outside the window
+            x = enemy.x
+            if x + enemy.width > left and x < right:
+                y = enemy.y
+                if back:
+                    x -= (x - enemy.prev_x) * back
+                    y -= (y - enemy.prev_y) * back
+                batch.append((atlas.surface, (x - camera_x, y), atlas.enemy_region(enemy)))
+
+        # Objects outside the queried window were never even looked at
+        culled = len(world.coins) + total - len(batch)
+
+        # Hero
+        if hero:
+            hero_x = hero.x - (hero.x - hero.prev_x) * back
+            hero_y = hero.y - (hero.y - hero.prev_y) * back
+            if hero_x + hero.width > left and hero_x < right:
+                batch.append((atlas.surface, (hero_x - camera_x, hero_y), atlas.hero_region(hero)))
+
+        if prof:
+            prof.mark("draw_cull")
+
+        # Draw background: the whole static layer, or with dirty rects and
+        # a still camera only what last frame's sprites and HUD covered
+        surface = screen.surface
+        offset = math.floor(camera_x)
+        static = self.static_layer
+        partial = self.dirty_rects and offset == self.offset
+        if partial:
+            static_blits = 0
+            for rect in self.drawn:
+                static_blits += static.draw(surface, offset, world, rect)
+        else:
+            static_blits = static.draw(surface, offset, world)
+        self.offset = offset
+        if prof:
+            prof.mark("draw_background")
+
+        drawn = surface.blits(batch, doreturn=self.dirty_rects)
+
+        # Health bar
+        if hero and hero.health < hero.max_health:
+            health_rect = self.health_rect
+            health_rect.x = int(hero_x - camera_x)
+            health_rect.y = int(hero_y - 8)
+            health_rect.width = int((hero.health / hero.max_health) * hero.width)
+            bar = surface.fill(HEALTH_COLOR, health_rect)
+            if drawn is not None:
+                drawn.append(bar)
+
+        self.stats["blits"] = len(batch)
+        self.stats["batches"] = 1
+        self.stats["culled"] = culled
+        self.stats["static_blits"] = static_blits
+        if prof:
+            prof.mark("draw_sprites")
+
+        hud = draw_hud(screen, world, doreturn=self.dirty_rects)
+        if drawn is not None:
+            drawn.extend(hud)
+            self.dirty = self.drawn + drawn if partial else [surface.get_rect()]
+            self.drawn = drawn
+        if prof:
+            prof.mark("draw_hud")
+
+class TextCache:
+    """Rendered text surfaces that are only re-rendered when their value changes
+
+    Each slot remembers the value it was last rendered for; lines whose
+    value is unchanged skip both the string formatting and the font render.
+    """
+
+    def __init__(self):
+        self.entries = {}  # slot -> (value, surface)
+
+    def get(self, slot, value, template, fontsize, color=TEXT_COLOR):
+        entry = self.entries.get(slot)
+        if entry is None or entry[0] != value:
+            text = template.format(*value) if isinstance(value, tuple) else template.format(value)
+            entry = self.entries[slot] = (value, ptext.getsurf(text, fontsize=fontsize,
+                                                               color=color))
+        return entry[1]
+
+hud_text = TextCache()
+
+class Hud:
+    """HUD state driven by world events rather than polled every frame"""
+
+    def __init__(self):
+        self.flash_until = -1  # World frame the health line stops flashing
+
+    def on_damage(self, events):
+        """events.HeroDamaged subscriber: flash the health line"""
+        self.flash_until = events[-1].frame + HIT_FLASH
+
+    def flashing(self, world):
+        # The distance check ignores flashes left over from before a restart
+        return 0 <= self.flash_until - world.frame <= HIT_FLASH
+
+hud = Hud()
+
+def draw_hud(screen, world, doreturn=False):
+    hero = world.hero
+    get = hud_text.get
+    health = (hero.health, hero.max_health)
+    if hud.flashing(world):
+        health_text = get("health_hit", health, "Vida: {}/{}", 24, HIT_COLOR)
+    else:
+        health_text = get("health", health, "Vida: {}/{}", 24)
+    return screen.surface.blits((
+        (health_text, (10, 10)),
+        (get("score", world.score, "Pontos: {}", 24), (10, 40)),
+        (get("level", world.level, "Nível: {}", 24), (10, 70)),
+        (get("on_ground", hero.on_ground, "No chão: {}", 16), (10, 100)),
+        (get("jumping", hero.is_jumping, "Pulando: {}", 16), (10, 120)),
+        (get("controls", None, "Setas para mover, ESPAÇO para pular", 16), (10, HEIGHT - 30)),
+        (get("menu", None, "ESC para menu", 16), (WIDTH - 150, HEIGHT - 30)),
+    ), doreturn=doreturn)
+
+renderer = Renderer()
+
+def draw_game(screen, world, alpha=1.0):
+    renderer.draw(screen, world, alpha)
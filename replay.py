@@ -0,0 +1,137 @@
+"""Deterministic input recording and headless replay.
+
+A recording is the world seed plus one input byte per frame and a CRC32
+hash of the gameplay state after that frame. A session that did not start
+from a fresh World (resumed with --snapshot-file) also stores a snapshot of
+the state it started from. Replaying restores that snapshot, feeds the
+bytes back through World.step() with no window, as fast as the CPU allows,
+and stops at the first frame whose state hash differs.
+
+File layout (little endian): header "<4sHIII" = magic, version, seed, frame
+count, start snapshot size, followed by a zlib-compressed body of
+frame_count input bytes, frame_count uint32 hashes and the start snapshot
+(empty for a fresh World).
+
+    python replay.py session.rec
+"""
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+import snapshot
+from world import World, Inputs
+
+MAGIC = b"PGRP"
+VERSION = 2
+HEADER = struct.Struct("<4sHIII")
+STATE = struct.Struct("<ddiii")
+
+# Bit per Inputs field, in field order
+INPUT_BITS = {name: 1 << i for i, name in enumerate(Inputs._fields)}
+
+def encode_inputs(inputs):
+    bits = 0
+    for value, bit in zip(inputs, INPUT_BITS.values()):
+        if value:
+            bits |= bit
+    return bits
+
+def decode_inputs(bits):
+    return Inputs(*(bool(bits & bit) for bit in INPUT_BITS.values()))
+
+def state_hash(world):
+    """CRC32 of hero position, health, score and coins collected"""
+    hero = world.hero
+    if hero is None:
+        return 0
+    return zlib.crc32(STATE.pack(hero.x, hero.y, hero.health, world.score, world.coins_collected))
+
+class Recording:
+    def __init__(self, seed, inputs=None, hashes=None, start=b""):
+        self.seed = seed
+        self.inputs = inputs if inputs is not None else bytearray()
+        self.hashes = hashes if hashes is not None else array("I")
+        self.start = bytes(start)  # Snapshot of the first frame's world, if not fresh
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def save(self, path):
+        hashes = self.hashes
+        if sys.byteorder != "little":
+            hashes = array("I", hashes)
+            hashes.byteswap()
+        body = zlib.compress(bytes(self.inputs) + hashes.tobytes() + self.start)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, len(self.inputs), len(self.start)))
+            f.write(body)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, seed, frames, start_size = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} recording")
+        body = zlib.decompress(data[HEADER.size:])
+        hashes = array("I")
+        end = frames * (1 + hashes.itemsize)
+        hashes.frombytes(body[frames:end])
+        if sys.byteorder != "little":
+            hashes.byteswap()
+        return cls(seed, bytearray(body[:frames]), hashes, body[end:end + start_size])
+
+class Recorder:
+    """Collects the inputs fed to a world and the state they produced"""
+
+    def __init__(self, world):
+        # A world already in a level (resumed from a snapshot file) is
+        # saved as it is, so the replay starts from the same state
+        start = snapshot.save(world) if world.hero is not None else b""
+        self.recording = Recording(world.seed, start=start)
+
+    def record(self, inputs, world):
+        """Call right after world.step(inputs)"""
+        self.recording.inputs.append(encode_inputs(inputs))
+        self.recording.hashes.append(state_hash(world))
+
+    def save(self, path):
+        self.recording.save(path)
+
+def replay(recording, world=None):
+    """Re-run a recording; returns the first mismatching frame or None
+
+    `world` must be a fresh World built with the recording's seed (and any
+    other options the session used); by default a plain one is created.
+    The recording's start snapshot, if any, is restored into it first.
+    """
+    if world is None:
+        world = World(seed=recording.seed)
+    if recording.start:
+        snapshot.restore(world, recording.start)
+    step = world.step
+    for frame, (bits, expected) in enumerate(zip(recording.inputs, recording.hashes)):
+        step(decode_inputs(bits))
+        if state_hash(world) != expected:
+            return frame
+    return None
+
+def main(argv):
+    if len(argv) != 2:
+        print("uso: python replay.py <gravacao.rec>")
+        return 2
+    recording = Recording.load(argv[1])
+    start = time.perf_counter()
+    mismatch = replay(recording)
+    elapsed = time.perf_counter() - start
+    fps = len(recording) / elapsed if elapsed else float("inf")
+    if mismatch is None:
+        print(f"OK: {len(recording)} frames reproduzidos ({fps:.0f} frames/s)")
+        return 0
+    print(f"DIVERGÊNCIA no frame {mismatch} de {len(recording)}")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
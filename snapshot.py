@@ -0,0 +1,385 @@
+"""Binary snapshots of the full world state, and a ring buffer of them.
+
+A snapshot holds everything World.step() reads: the hero, every resident
+enemy and coin, score, camera, frame, AI scheduler and random generator
+state, and the coins taken so far. Restoring one and stepping on gives
+the same frames as the original run. The level itself is not copied, but
+the world's start_snapshot is, so restarting the level after a restore
+into another World still returns to the state the level began in.
+Restoring into the same level instance only overwrites fields. Otherwise
+the level is rebuilt with init_game(level, level_data) first, and any
+missing chunks are streamed in.
+
+Per-entity fields are stored as one array per field, so a field of every
+enemy is packed or unpacked with a single struct call (or a NumPy copy
+with the enemy pool). The cost grows with the resident entities, never
+with the size of the level.
+
+File layout (little endian): HEADER, RNG and its state words, HERO, then the enemy field
+arrays (ENEMY_FIELDS, plus one awake byte each), the coin field arrays
+(COIN_FIELDS, plus one active byte each), the coin log as int32
+(chunk, index) pairs and the start snapshot (empty inside a start snapshot).
+
+SnapshotRing keeps the last `capacity` snapshots in fixed-size slots of
+one preallocated buffer. That buffer is a bytearray, or an mmap'd file
+that still holds the newest snapshot after a crash:
+
+    ring = SnapshotRing(capacity=180, path="sessao.snap")
+    ring.push(world)            # every tick
+    ring.rewind(world)          # one tick back
+    SnapshotRing.open("sessao.snap").restore(World())  # after a crash
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from itertools import chain
+from operator import attrgetter
+
+from collision import SweepAndPrune
+from levels import little_endian
+
+MAGIC = b"PGSS"
+VERSION = 4
+# magic, version, size, level, generation, game state, frame, score, coins
+# collected, camera x, previous camera x, chunk window (first, last), AI
+# cursor, evaluations, deferred and total, enemies, coins, coin log ints,
+# start snapshot bytes
+HEADER = struct.Struct("<4sHIIIBIiIddiiIIIQIIII")
+RNG = struct.Struct("<?d")  # gauss_next, then the 625 uint32 Mersenne Twister words
+RNG_WORDS = 625
+HERO_FIELDS = ("x", "y", "prev_x", "prev_y", "vel_x", "vel_y",
+               "health", "max_health", "animation_frame", "animation_timer",
+               "on_ground", "facing_right", "is_jumping", "is_running")
+HERO = struct.Struct("<6d4i4?")
+# (attribute, struct code); EnemyPool arrays use the same types and
+# assign_enemy/assign_coin the same order
+ENEMY_FIELDS = (("x", "d"), ("y", "d"), ("prev_x", "d"), ("prev_y", "d"),
+                ("vel_x", "d"), ("vel_y", "d"), ("attack_timer", "i"), ("health", "i"),
+                ("animation_frame", "i"), ("animation_timer", "i"),
+                ("next_hit_frame", "i"), ("on_ground", "?"), ("is_attacking", "?"))
+COIN_FIELDS = (("animation_frame", "i"), ("animation_timer", "i"))
+ENEMY_RECORD = sum(struct.calcsize(code) for _, code in ENEMY_FIELDS) + 1
+COIN_RECORD = sum(struct.calcsize(code) for _, code in COIN_FIELDS) + 1
+
+RING_MAGIC = b"PGSR"
+RING_HEADER = struct.Struct("<4sHIIII")  # magic, version, capacity, slot size, head, count
+RING_CAPACITY = 180  # 3 seconds at 60 ticks per second
+SLOT_SIZE = 32 * 1024
+
+_hero_fields = attrgetter(*HERO_FIELDS)
+
+@lru_cache(maxsize=64)
+def columns(fields, n):
+    """Struct of one n-long array per (name, code) field"""
+    return struct.Struct("<" + "".join(f"{n}{code}" for _, code in fields))
+
+def pack_columns(buffer, offset, fields, objects):
+    layout = columns(fields, len(objects))
+    layout.pack_into(buffer, offset, *chain.from_iterable(
+        map(attrgetter(name), objects) for name, _ in fields))
+    return offset + layout.size
+
+def unpack_columns(buffer, offset, fields, objects, assign):
+    """Hand each object its row of the field arrays: assign(obj, values)"""
+    n = len(objects)
+    layout = columns(fields, n)
+    values = layout.unpack_from(buffer, offset)
+    rows = zip(*(values[i * n:(i + 1) * n] for i in range(len(fields))))
+    for obj, row in zip(objects, rows):
+        assign(obj, row)
+    return offset + layout.size
+
+# One tuple assignment per object is much cheaper than a setattr per field
+def assign_enemy(enemy, values):
+    (enemy.x, enemy.y, enemy.prev_x, enemy.prev_y, enemy.vel_x, enemy.vel_y,
+     enemy.attack_timer, enemy.health, enemy.animation_frame, enemy.animation_timer,
+     enemy.next_hit_frame, enemy.on_ground, enemy.is_attacking) = values
+
+def assign_coin(coin, values):
+    coin.animation_frame, coin.animation_timer = values
+
+def resident_coins(world):
+    """Every coin of the resident chunks, taken or not, in level order"""
+    resident = world.resident_chunks
+    return [coin for index in sorted(resident) for coin in resident[index][2]]
+
+def size(world, coins=None):
+    """Bytes a snapshot of `world` takes"""
+    if coins is None:
+        coins = resident_coins(world)
+    return (HEADER.size + RNG.size + RNG_WORDS * 4 + HERO.size + len(world.enemies) * ENEMY_RECORD +
+            len(coins) * COIN_RECORD + len(world.coin_log) * 4 + len(world.start_snapshot or b""))
+
+def write(world, buffer, offset=0, limit=None):
+    """Write a snapshot of `world` into buffer at offset; returns its size"""
+    hero = world.hero
+    if hero is None:
+        raise ValueError("no level has been started")
+    enemies = world.enemies
+    coins = resident_coins(world)
+    total = size(world, coins)
+    if limit is not None and total > limit:
+        raise ValueError(f"a {total} byte snapshot does not fit in {limit} bytes")
+
+    ai = world.ai
+    start = world.start_snapshot or b""
+    first, last = world.chunk_window or (-1, -1)
+    HEADER.pack_into(buffer, offset, MAGIC, VERSION, total, world.level, world.generation,
+                     world.game_state, world.frame, world.score, world.coins_collected,
+                     world.camera_x, world.prev_camera_x, first, last,
+                     ai.cursor, ai.evaluations, ai.deferred, ai.total,
+                     len(enemies), len(coins), len(world.coin_log), len(start))
+    offset += HEADER.size
+    _, state, gauss = world.rng.getstate()
+    RNG.pack_into(buffer, offset, gauss is not None, gauss or 0.0)
+    offset += RNG.size
+    words = array("I", state)
+    if sys.byteorder != "little":
+        words.byteswap()
+    buffer[offset:offset + RNG_WORDS * 4] = words.tobytes()
+    offset += RNG_WORDS * 4
+    HERO.pack_into(buffer, offset, *_hero_fields(hero))
+    offset += HERO.size
+
+    n = len(enemies)
+    pool = world.enemy_pool
+    if pool is not None:
+        import numpy as np
+
+        for name, code in ENEMY_FIELDS:
+            np.frombuffer(buffer, "<" + code, n, offset)[:] = getattr(pool, name)
+            offset += n * struct.calcsize(code)
+    else:
+        offset = pack_columns(buffer, offset, ENEMY_FIELDS, enemies)
+    awake_ids = set(map(id, world.awake_enemies))
+    buffer[offset:offset + n] = bytes(id(enemy) in awake_ids for enemy in enemies)
+    offset += n
+
+    n = len(coins)
+    offset = pack_columns(buffer, offset, COIN_FIELDS, coins)
+    active_ids = set(map(id, world.active_coins))
+    buffer[offset:offset + n] = bytes(id(coin) in active_ids for coin in coins)
+    offset += n
+
+    log = world.coin_log
+    buffer[offset:offset + len(log) * 4] = little_endian(log)
+    offset += len(log) * 4
+    buffer[offset:offset + len(start)] = start
+    return total
+
+def save(world):
+    """A snapshot of `world` as a new bytearray"""
+    buffer = bytearray(size(world))
+    write(world, buffer)
+    return buffer
+
+def restore(world, buffer, offset=0, level_data=None):
+    """Put `world` back in the state a snapshot recorded
+
+    `level_data` is only used when the level has to be rebuilt; without it
+    the level number is loaded from its file as World.init_game does.
+    """
+    (magic, version, total, level, generation, game_state, frame, score, coins_collected,
+     camera_x, prev_camera_x, first, last, cursor, evaluations, deferred, ai_total,
+     enemy_count, coin_count, log_ints, start_size) = HEADER.unpack_from(buffer, offset)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} snapshot")
+    view = memoryview(buffer)[offset:offset + total]
+    offset = HEADER.size
+
+    same_level = (world.hero is not None and world.level_data is not None and
+                  world.generation == generation and world.level == level)
+    if not same_level:
+        world.init_game(level, level_data)
+
+    # Coins taken: undo the ones taken since the snapshot when its log is
+    # a prefix of the current one, else replace the whole set
+    start_at = total - start_size
+    log_at = start_at - log_ints * 4
+    log = array("i")
+    log.frombytes(view[log_at:start_at])
+    if sys.byteorder != "little":
+        log.byteswap()
+    current = world.coin_log
+    coins_changed = not same_level or current != log
+    if coins_changed:
+        if same_level and log_ints < len(current) and current[:log_ints] == log:
+            undone = current[log_ints:]
+            for i in range(0, len(undone), 2):
+                world.collected_coins.discard((undone[i], undone[i + 1]))
+            del current[log_ints:]
+        else:
+            world.collected_coins = set(zip(log[0::2], log[1::2]))
+            world.coin_log = log
+
+    world.camera_x = camera_x
+    window = None if first < 0 else (first, last)
+    if window != world.chunk_window:
+        world.stream_chunks()
+        coins_changed = True
+    coins = resident_coins(world)
+    if len(world.enemies) != enemy_count or len(coins) != coin_count:
+        raise ValueError("snapshot does not match the level's chunks")
+
+    world.game_state = game_state
+    world.frame = frame
+    world.score = score
+    world.coins_collected = coins_collected
+    world.prev_camera_x = prev_camera_x
+    world.events.clear()
+    if start_size:
+        world.start_snapshot = bytes(view[start_at:total])
+    ai = world.ai
+    ai.cursor, ai.evaluations, ai.deferred, ai.total = cursor, evaluations, deferred, ai_total
+
+    has_gauss, gauss = RNG.unpack_from(view, offset)
+    offset += RNG.size
+    words = array("I")
+    words.frombytes(view[offset:offset + RNG_WORDS * 4])
+    if sys.byteorder != "little":
+        words.byteswap()
+    world.rng.setstate((3, tuple(words), gauss if has_gauss else None))
+    offset += RNG_WORDS * 4
+    hero = world.hero
+    for name, value in zip(HERO_FIELDS, HERO.unpack_from(view, offset)):
+        setattr(hero, name, value)
+    offset += HERO.size
+
+    enemies = world.enemies
+    n = enemy_count
+    pool = world.enemy_pool
+    if pool is not None:
+        import numpy as np
+
+        for name, code in ENEMY_FIELDS:
+            getattr(pool, name)[:] = np.frombuffer(view, "<" + code, n, offset)
+            offset += n * struct.calcsize(code)
+    else:
+        offset = unpack_columns(view, offset, ENEMY_FIELDS, enemies, assign_enemy)
+        world.enemy_broadphase.resort()
+    if world.active_radius is None:
+        world.awake_enemies = enemies
+        world.sleeping_enemies = []
+    else:
+        awake = view[offset:offset + n]
+        world.awake_enemies = [enemy for enemy, flag in zip(enemies, awake) if flag]
+        world.sleeping_enemies = [enemy for enemy, flag in zip(enemies, awake) if not flag]
+    offset += n
+
+    n = coin_count
+    offset = unpack_columns(view, offset, COIN_FIELDS, coins, assign_coin)
+    if coins_changed:
+        collected = world.collected_coins
+        for coin in coins:
+            coin.collected = coin.key in collected
+        world.coins[:] = [coin for coin in coins if not coin.collected]
+        world.coin_broadphase = SweepAndPrune(world.coins)
+    active = view[offset:offset + n]
+    world.active_coins = [coin for coin, flag in zip(coins, active) if flag and not coin.collected]
+
+class SnapshotRing:
+    """The last `capacity` snapshots, each in a slot of slot_size bytes
+
+    With `path`, the slots live in an mmap'd file (created or truncated)
+    whose header is only updated once a snapshot is completely written.
+    Slots grow (all of them, once) when a snapshot does not fit.
+    """
+
+    def __init__(self, capacity=RING_CAPACITY, slot_size=SLOT_SIZE, path=None):
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.head = 0  # Slot the next snapshot goes to
+        self.count = 0
+        self.file = None
+        length = RING_HEADER.size + capacity * slot_size
+        if path is None:
+            self.buffer = bytearray(length)
+        else:
+            self.file = open(path, "w+b")
+            self.file.truncate(length)
+            self.buffer = mmap.mmap(self.file.fileno(), length)
+        self._write_header()
+
+    @classmethod
+    def open(cls, path):
+        """Map an existing ring file, e.g. to resume a crashed session"""
+        ring = cls.__new__(cls)
+        ring.file = open(path, "r+b")
+        ring.buffer = mmap.mmap(ring.file.fileno(), os.path.getsize(path))
+        magic, version, ring.capacity, ring.slot_size, ring.head, ring.count = \
+            RING_HEADER.unpack_from(ring.buffer)
+        if magic != RING_MAGIC or version != VERSION:
+            ring.close()
+            raise ValueError(f"{path}: not a version {VERSION} snapshot ring")
+        return ring
+
+    def __len__(self):
+        return self.count
+
+    def _write_header(self):
+        RING_HEADER.pack_into(self.buffer, 0, RING_MAGIC, VERSION, self.capacity,
+                              self.slot_size, self.head, self.count)
+
+    def _offset(self, back):
+        if not 0 <= back < self.count:
+            raise IndexError(f"only {self.count} snapshots stored")
+        slot = (self.head - 1 - back) % self.capacity
+        return RING_HEADER.size + slot * self.slot_size
+
+    def push(self, world):
+        """Snapshot `world` into the next slot, overwriting the oldest"""
+        needed = size(world)
+        if needed > self.slot_size:
+            self._resize(max(needed, 2 * self.slot_size))
+        write(world, self.buffer, RING_HEADER.size + self.head * self.slot_size, self.slot_size)
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self._write_header()
+
+    def _resize(self, slot_size):
+        # Rare (the coin log only grows slowly), so simply copy the stored
+        # snapshots out and lay them out again, oldest first
+        stored = [bytes(self.get(back)) for back in reversed(range(self.count))]
+        length = RING_HEADER.size + self.capacity * slot_size
+        if self.file is None:
+            self.buffer = bytearray(length)
+        else:
+            self.buffer.resize(length)
+        self.slot_size = slot_size
+        for slot, data in enumerate(stored):
+            offset = RING_HEADER.size + slot * slot_size
+            self.buffer[offset:offset + len(data)] = data
+        self.head = self.count % self.capacity
+        self._write_header()
+
+    def get(self, back=0):
+        """The snapshot `back` pushes before the newest, as a memoryview"""
+        offset = self._offset(back)
+        return memoryview(self.buffer)[offset:offset + self.slot_size]
+
+    def restore(self, world, back=0, level_data=None):
+        """Restore the snapshot `back` pushes ago and forget the newer ones"""
+        restore(world, self.buffer, self._offset(back), level_data)
+        self.head = (self.head - back) % self.capacity
+        self.count -= back
+        self._write_header()
+
+    def rewind(self, world, ticks=1, level_data=None):
+        """Go back up to `ticks` snapshots; returns how many it went back"""
+        ticks = min(ticks, self.count - 1)
+        if ticks > 0:
+            self.restore(world, ticks, level_data)
+        return max(ticks, 0)
+
+    def clear(self):
+        self.head = self.count = 0
+        self._write_header()
+
+    def close(self):
+        if self.file is not None:
+            self.buffer.close()
+            self.file.close()
+            self.file = None
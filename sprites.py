@@ -0,0 +1,150 @@
+"""Sprite atlas with every animation frame pre-baked at startup.
+
+The hero, enemy and coin looks are still defined procedurally (the paint_*
+functions below use the same rects and colors the per-frame draw code
+used), but they are painted once per (frame, facing, state, type) into one
+atlas surface. Drawing an entity is then a single blit of an atlas region.
+
+Run `python sprites.py atlas.png` to dump the atlas for visual checks.
+"""
+import math
+import sys
+
+import pygame
+from pygame import Rect
+
+HERO_FRAMES = 4
+ENEMY_FRAMES = 3
+COIN_FRAMES = 4
+ENEMY_TYPES = ("basic", "strong")
+
+HERO_SIZE = (32, 32)
+ENEMY_SIZE = (24, 24)
+COIN_SIZE = (16, 16)
+
+def paint_hero(surface, frame, facing_right, is_running, is_jumping):
+    width, height = HERO_SIZE
+    color = (0, 150, 255)  # Blue
+
+    # Animation effects
+    if is_jumping:
+        color = (0, 200, 255)  # Lighter blue when jumping
+    elif is_running:
+        color = (0, 100, 255)  # Darker blue when running
+
+    # Body
+    surface.fill(color, Rect(8, 8, width - 16, height - 16))
+
+    # Head
+    head_size = 12
+    head_x = (width - head_size) // 2
+    head_y = 4
+    surface.fill((255, 200, 150), Rect(head_x, head_y, head_size, head_size))  # Skin color
+
+    # Eyes
+    eye_size = 2
+    if facing_right:
+        eye_x = head_x + 8
+    else:
+        eye_x = head_x + 2
+    surface.fill((0, 0, 0), Rect(eye_x, head_y + 3, eye_size, eye_size))
+
+    # Legs (animation)
+    leg_width = 4
+    leg_height = 8
+    leg_y = height - leg_height
+    if is_running:
+        offset = math.sin(frame * 0.5) * 2
+        left_leg_x = 6 + offset
+        right_leg_x = width - 10 - offset
+    else:
+        left_leg_x = 6
+        right_leg_x = width - 10
+    surface.fill(color, Rect(left_leg_x, leg_y, leg_width, leg_height))
+    surface.fill(color, Rect(right_leg_x, leg_y, leg_width, leg_height))
+
+def paint_enemy(surface, frame, enemy_type, is_attacking):
+    width, height = ENEMY_SIZE
+    if is_attacking:
+        if enemy_type == "basic":
+            color = (255, 50, 50)  # Darker red when attacking
+        else:
+            color = (255, 100, 0)  # Darker orange when attacking
+    else:
+        if enemy_type == "basic":
+            color = (255, 100, 100)  # Red
+        else:
+            color = (255, 150, 0)  # Orange
+
+    # Animation effect
+    size_offset = math.sin(frame * 0.3) * 2
+
+    # Body
+    surface.fill(color, Rect(4, 4, width - 8 + size_offset, height - 8 + size_offset))
+
+    # Eyes
+    eye_size = 3
+    surface.fill((255, 255, 255), Rect(6, 6, eye_size, eye_size))
+    surface.fill((255, 255, 255), Rect(width - 9, 6, eye_size, eye_size))
+
+    # Pupils
+    pupil_size = 1
+    surface.fill((0, 0, 0), Rect(7, 7, pupil_size, pupil_size))
+    surface.fill((0, 0, 0), Rect(width - 8, 7, pupil_size, pupil_size))
+
+def paint_coin(surface, frame):
+    width, height = COIN_SIZE
+    size = 12 + math.sin(frame * 0.5) * 2
+    surface.fill((255, 215, 0), Rect((width - size) // 2, (height - size) // 2, size, size))  # Gold
+
+class SpriteAtlas:
+    """All entity frames packed into one surface, one row per entity kind"""
+
+    def __init__(self):
+        rows = [
+            (HERO_SIZE, [(("hero", frame, facing_right, is_running, is_jumping),
+                          lambda s, a=(frame, facing_right, is_running, is_jumping): paint_hero(s, *a))
+                         for is_jumping in (False, True)
+                         for is_running in (False, True)
+                         for facing_right in (True, False)
+                         for frame in range(HERO_FRAMES)]),
+            (ENEMY_SIZE, [(("enemy", enemy_type, is_attacking, frame),
+                           lambda s, a=(frame, enemy_type, is_attacking): paint_enemy(s, *a))
+                          for enemy_type in ENEMY_TYPES
+                          for is_attacking in (False, True)
+                          for frame in range(ENEMY_FRAMES)]),
+            (COIN_SIZE, [(("coin", frame), lambda s, f=frame: paint_coin(s, f))
+                         for frame in range(COIN_FRAMES)]),
+        ]
+        atlas_width = max(size[0] * len(entries) for size, entries in rows)
+        atlas_height = sum(size[1] for size, _ in rows)
+        self.surface = pygame.Surface((atlas_width, atlas_height), pygame.SRCALPHA)
+        self.regions = {}
+
+        top = 0
+        for (width, height), entries in rows:
+            for column, (key, paint) in enumerate(entries):
+                area = Rect(column * width, top, width, height)
+                paint(self.surface.subsurface(area))
+                self.regions[key] = area
+            top += height
+
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+
+    def hero_region(self, hero):
+        return self.regions["hero", hero.animation_frame, hero.facing_right,
+                            hero.is_running, hero.is_jumping]
+
+    def enemy_region(self, enemy):
+        return self.regions["enemy", enemy.type, enemy.is_attacking, enemy.animation_frame]
+
+    def coin_region(self, coin):
+        return self.regions["coin", coin.animation_frame]
+
+    def save(self, path):
+        """Write the atlas to an image file (PNG by extension)"""
+        pygame.image.save(self.surface, path)
+
+if __name__ == "__main__":
+    SpriteAtlas().save(sys.argv[1] if len(sys.argv) > 1 else "atlas.png")
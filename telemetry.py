@@ -0,0 +1,399 @@
+"""Run telemetry, uploaded to a leaderboard in the background.
+
+RunTelemetry subscribes to the world's event bus and turns every ending
+(GameOver or Victory) into one record:
+
+    {"run_id": "9f1c...", "player": "ana", "seed": 42, "level": 1,
+     "outcome": "victory", "score": 50, "time_s": 31.2, "deaths": 2,
+     "coins": 5, "hits": 4, "frame_ms": {"p50": 16.7, "p95": 17.9, "p99": 24.1}}
+
+Records go to an Uploader, which runs an asyncio loop on its own daemon
+thread: the pgzero update/draw callbacks only hand a record over, they
+never wait on a socket or a file. The uploader collects records in a
+bounded queue, posts them in batches as JSON ({"runs": [...]}) and, when
+the server cannot be reached, appends them to a JSON Lines spool file and
+retries with exponential backoff. The spool is sent first on the next
+successful attempt, also in a later session, and a queue that overflows
+spills into it instead of dropping records.
+
+The module also runs a stand-in leaderboard server for offline testing
+(POST /runs, GET /leaderboard); --fail-rate makes it refuse some uploads:
+
+    python telemetry.py --port 8765 --fail-rate 0.3
+    python main.py --telemetry-url http://127.0.0.1:8765/runs
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import uuid
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from events import CoinCollected, HeroDamaged, GameOver, Victory
+from profiler import percentile
+
+QUEUE_SIZE = 256
+BATCH_SIZE = 32
+BATCH_DELAY = 2.0  # Seconds to wait for more records before posting a batch
+TIMEOUT = 5.0  # Seconds for one upload, connect to response
+MIN_BACKOFF = 1.0
+MAX_BACKOFF = 300.0
+SPOOL_LIMIT = 4 * 1024 * 1024  # Bytes; records beyond it are dropped
+LEADERBOARD_SIZE = 10
+
+class UploadError(Exception):
+    """The server answered with an error worth retrying"""
+
+class RunTelemetry:
+    """Builds one record per run ending from the events of a World
+
+    `deaths` counts the game overs since the level was entered, so a
+    victory after two restarts reports deaths=2. main.py calls
+    start_attempt() whenever a level starts and frame_time() every
+    rendered frame while playing.
+    """
+
+    def __init__(self, uploader, player, seed, tick_rate=60):
+        self.uploader = uploader
+        self.player = player
+        self.seed = seed
+        self.tick_rate = tick_rate
+        self.level = None
+        self.deaths = 0
+        self.hits = 0
+        self.coins = 0
+        self.frame_times = array("f")  # Seconds between rendered frames
+
+    def subscribe(self, bus):
+        bus.subscribe(self.on_events, CoinCollected, HeroDamaged, GameOver, Victory)
+
+    def start_attempt(self, level, restarted=False):
+        """A level (re)started; a restart after a game over keeps the deaths"""
+        if not restarted:
+            self.deaths = 0
+        self.level = level
+        self.hits = 0
+        self.coins = 0
+        del self.frame_times[:]
+
+    def frame_time(self, dt):
+        self.frame_times.append(dt)
+
+    def on_events(self, events):
+        for event in events:
+            kind = type(event)
+            if kind is CoinCollected:
+                self.coins += 1
+            elif kind is HeroDamaged:
+                self.hits += 1
+            elif kind is GameOver:
+                self.deaths += 1
+                self.uploader.submit(self.record(event, "game_over"))
+            elif kind is Victory:
+                self.uploader.submit(self.record(event, "victory"))
+
+    def record(self, event, outcome):
+        times = sorted(self.frame_times)
+        return {"run_id": uuid.uuid4().hex, "player": self.player, "seed": self.seed,
+                "level": self.level, "outcome": outcome, "score": event.score,
+                "time_s": round(event.frame / self.tick_rate, 2), "deaths": self.deaths,
+                "coins": self.coins, "hits": self.hits,
+                "frame_ms": {name: round(percentile(times, fraction) * 1000, 2)
+                             for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}}
+
+class Uploader:
+    """Posts records to `url` in batches from a background asyncio loop
+
+    submit() is safe to call from any thread and returns at once. close()
+    does not wait on the network either: whatever is still queued or in
+    flight is written to the spool and sent by the next session.
+    """
+
+    def __init__(self, url, spool_path, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 batch_delay=BATCH_DELAY, timeout=TIMEOUT, spool_limit=SPOOL_LIMIT):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"not an http(s) URL: {url!r}")
+        self.url = parts
+        self.spool_path = spool_path
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.timeout = timeout
+        self.spool_limit = spool_limit
+        self.sent = 0
+        self.spooled = 0
+        self.dropped = 0
+        self.rejected = 0
+        self._rng = random.Random()  # Backoff jitter; not the world's generator
+        self._loop = None
+        self._queue = None
+        self._task = None
+        self._pending = []  # Batch taken off the queue but not yet delivered
+        self._thread = None
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=asyncio.run, args=(self._main(ready),),
+                                        name="telemetry", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def submit(self, record):
+        loop = self._loop
+        if loop is None:
+            self.dropped += 1
+            return
+        loop.call_soon_threadsafe(self._enqueue, record)
+
+    def close(self, timeout=1.0):
+        if self._thread is None:
+            return
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                pass  # Loop closed in the meantime
+        self._thread.join(timeout)
+        self._thread = None
+
+    async def _main(self, ready):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.queue_size)
+        self._task = asyncio.current_task()
+        ready.set()
+        try:
+            await self._work()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            leftover = self._pending
+            while not self._queue.empty():
+                leftover.append(self._queue.get_nowait())
+            self._spool(leftover)
+            self._loop = None
+
+    def _enqueue(self, record):
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self._spool([record])
+
+    async def _work(self):
+        backoff = 0.0
+        while True:
+            if backoff:
+                await asyncio.sleep(backoff * self._rng.uniform(0.5, 1.0))
+            # Idle until a record arrives, unless spooled ones are waiting
+            await self._collect(0 if self._spool_size() else None)
+            try:
+                await self._flush_spool()
+                if self._pending:
+                    await self._deliver(self._pending)
+                backoff = 0.0
+            except (OSError, asyncio.TimeoutError, UploadError):
+                self._spool(self._pending)
+                backoff = min(MAX_BACKOFF, max(MIN_BACKOFF, backoff * 2))
+            self._pending = []
+
+    async def _collect(self, wait):
+        """Fill _pending: the first record within `wait` seconds (None =
+        forever), then whatever else arrives within batch_delay, up to
+        batch_size"""
+        batch = self._pending
+        try:
+            batch.append(await asyncio.wait_for(self._queue.get(), wait))
+        except asyncio.TimeoutError:
+            return
+        deadline = self._loop.time() + self.batch_delay
+        while len(batch) < self.batch_size:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _deliver(self, records):
+        status = await asyncio.wait_for(self._post(records), self.timeout)
+        if 200 <= status < 300:
+            self.sent += len(records)
+        elif status in (408, 429) or status >= 500:
+            raise UploadError(f"HTTP {status}")
+        else:
+            self.rejected += len(records)  # Retrying won't change the answer
+
+    async def _post(self, records):
+        """POST {"runs": records} and return the response status"""
+        url = self.url
+        https = url.scheme == "https"
+        reader, writer = await asyncio.open_connection(
+            url.hostname, url.port or (443 if https else 80), ssl=https or None)
+        try:
+            body = json.dumps({"runs": records}).encode()
+            path = url.path or "/"
+            if url.query:
+                path += "?" + url.query
+            writer.write(f"POST {path} HTTP/1.1\r\nHost: {url.netloc}\r\n"
+                         f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+            status_line = await reader.readline()
+            try:
+                return int(status_line.split()[1])
+            except (IndexError, ValueError):
+                raise UploadError(f"bad response {status_line[:80]!r}") from None
+        finally:
+            writer.close()
+
+    def _spool_size(self):
+        try:
+            return os.path.getsize(self.spool_path)
+        except OSError:
+            return 0
+
+    def _spool(self, records):
+        if not records:
+            return
+        room = self.spool_limit - self._spool_size()
+        lines = []
+        for record in records:
+            line = json.dumps(record) + "\n"
+            if len(line) > room:
+                self.dropped += 1
+                continue
+            room -= len(line)
+            lines.append(line)
+        if lines:
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+            self.spooled += len(lines)
+
+    async def _flush_spool(self):
+        """Send spooled records, oldest first; keep what was not sent"""
+        if not self._spool_size():
+            return
+        with open(self.spool_path, "rb") as f:
+            data = f.read()
+        records = []
+        for line in data.splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                self.dropped += 1  # Torn write from a crash
+        lines = [json.dumps(record) + "\n" for record in records]
+        sent = 0
+        try:
+            while sent < len(records):
+                chunk = records[sent:sent + self.batch_size]
+                await self._deliver(chunk)
+                sent += len(chunk)
+        finally:
+            # Run ids let the server drop a batch that arrives twice.
+            # Overflow spooled while a batch was in flight went past the
+            # bytes read above and is kept after the unsent records.
+            if sent:
+                with open(self.spool_path, "rb") as f:
+                    f.seek(len(data))
+                    added = f.read()
+                rest = "".join(lines[sent:]).encode() + added
+                if rest:
+                    temp = self.spool_path + ".tmp"
+                    with open(temp, "wb") as f:
+                        f.write(rest)
+                    os.replace(temp, self.spool_path)
+                else:
+                    os.remove(self.spool_path)
+
+class LeaderboardHandler(BaseHTTPRequestHandler):
+    """Stand-in leaderboard: POST /runs stores runs, GET /leaderboard ranks them"""
+
+    def do_POST(self):
+        server = self.server
+        if self.path != "/runs":
+            return self.reply(404, {"error": "not found"})
+        if server.rng.random() < server.fail_rate:
+            return self.reply(503, {"error": "simulated outage"})
+        try:
+            runs = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["runs"]
+            ids = [run["run_id"] for run in runs]
+        except (TypeError, KeyError, ValueError):
+            return self.reply(400, {"error": "expected {\"runs\": [...]}"})
+        with server.lock:
+            accepted = []
+            for run_id, run in zip(ids, runs):
+                if run_id not in server.run_ids:
+                    server.run_ids.add(run_id)
+                    server.runs.append(run)
+                    accepted.append(run)
+            if server.output:
+                with open(server.output, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(run) + "\n" for run in accepted)
+        self.reply(200, {"accepted": len(accepted), "duplicates": len(runs) - len(accepted)})
+
+    def do_GET(self):
+        if self.path != "/leaderboard":
+            return self.reply(404, {"error": "not found"})
+        with self.server.lock:
+            best = sorted(self.server.runs, key=lambda run: run["score"], reverse=True)
+        self.reply(200, best[:LEADERBOARD_SIZE])
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def make_server(host="127.0.0.1", port=8765, output=None, fail_rate=0.0, verbose=False):
+    """Stand-in leaderboard server; runs already in `output` are loaded"""
+    server = ThreadingHTTPServer((host, port), LeaderboardHandler)
+    server.lock = threading.Lock()
+    server.runs = []
+    server.run_ids = set()
+    server.output = output
+    server.fail_rate = fail_rate
+    server.rng = random.Random()
+    server.verbose = verbose
+    if output and os.path.exists(output):
+        with open(output, encoding="utf-8") as f:
+            server.runs = [json.loads(line) for line in f if line.strip()]
+        server.run_ids = {run["run_id"] for run in server.runs}
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local de placar para testar a telemetria")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="guarda as partidas recebidas em JSON Lines")
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="fração de envios recusados com 503, para testar as novas tentativas")
+    parser.add_argument("--verbose", action="store_true", help="mostra cada requisição")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.output, args.fail_rate, args.verbose)
+    print(f"Placar em http://{args.host}:{server.server_port}/leaderboard "
+          f"(envios em /runs)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""Static level geometry as rows of byte tiles.
+
+The world is cut into TILE_SIZE squares, one byte each: EMPTY, GROUND or
+PLATFORM. Levels still describe geometry as platforms and holes in the
+ground (see levels.py); chunk_runs() turns a chunk into run-length rows,
+(row, column, length, tile) four ints per run, so a thousand pixels of
+ground cost one run per tile row. The World keeps the runs of its resident
+chunks and expands them into a TileMap: one bytearray per row covering
+those chunks, so a tile lookup is two index operations however long the
+level is.
+
+Columns outside the loaded window read as the level's default column
+(ground, no platforms), the same ground that used to be a global
+`HEIGHT - 100` check, so entities at the edge of the window never fall
+through.
+"""
+import math
+import re
+from array import array
+from collections import namedtuple
+
+TILE_SIZE = 10
+
+EMPTY = 0
+GROUND = 1
+PLATFORM = 2
+
+# A solid rectangle of merged tiles, in pixels
+Box = namedtuple("Box", ["x", "y", "width", "height"])
+
+_SOLID_RUN = re.compile(rb"[^\x00]+")
+_TILE_RUN = re.compile(rb"([^\x00])\1*", re.DOTALL)
+
+def to_tiles(pixels, tile_size=TILE_SIZE):
+    """Nearest tile boundary of a pixel coordinate"""
+    return (int(pixels) + tile_size // 2) // tile_size
+
+def chunk_runs(chunk, left, right, ground_row, rows, tile_size=TILE_SIZE):
+    """Run-length tile rows of a level chunk spanning pixels [left, right)
+
+    Ground fills rows ground_row and below across the chunk, minus its
+    holes; platforms are drawn over it. Edges snap to the nearest tile
+    boundary, and every platform keeps at least one tile each way.
+    """
+    runs = array("i")
+    first, end = to_tiles(left, tile_size), to_tiles(right, tile_size)
+    # The ground, as spans between the holes
+    h = chunk.holes
+    holes = sorted((to_tiles(h[i], tile_size), to_tiles(h[i] + h[i + 1], tile_size))
+                   for i in range(0, len(h), 2))
+    spans = []
+    col = first
+    for start, stop in holes:
+        if start > col:
+            spans.append((col, min(start, end)))
+        col = max(col, stop)
+    if col < end:
+        spans.append((col, end))
+    for row in range(ground_row, rows):
+        for start, stop in spans:
+            if stop > start:
+                runs.extend((row, start, stop - start, GROUND))
+    p = chunk.platforms
+    for i in range(0, len(p), 4):
+        x, y = to_tiles(p[i], tile_size), to_tiles(p[i + 1], tile_size)
+        width = max(1, to_tiles(p[i] + p[i + 2], tile_size) - x)
+        height = max(1, to_tiles(p[i + 1] + p[i + 3], tile_size) - y)
+        for row in range(max(y, 0), min(y + height, rows)):
+            runs.extend((row, x, width, PLATFORM))
+    return runs
+
+class TileMap:
+    """Byte tiles of the loaded columns of a level, one bytearray per row
+
+    load() rebuilds the window from run-length chunks. tile() is the O(1)
+    lookup; boxes() and landing_y() answer the two collision questions
+    the world asks (what can a moving box hit, where does a falling one
+    land) by reading only the tiles around the mover.
+    """
+
+    def __init__(self, rows, ground_row, tile_size=TILE_SIZE):
+        self.tile_size = tile_size
+        self.ground_row = ground_row
+        self.rows = [bytearray() for _ in range(rows)]
+        # Tiles of every column outside the window
+        self.default = bytes(GROUND if row >= ground_row else EMPTY for row in range(rows))
+        self.origin = 0  # Level column of index 0 in every row
+        self.columns = 0
+        self.top_row = ground_row  # Highest row holding any tile
+        self._all_boxes = None  # Built by all_boxes() on first use after a load
+
+    def load(self, first_column, columns, chunks):
+        """Fill columns [first_column, first_column + columns) from chunk runs"""
+        rows = self.rows
+        for row in range(len(rows)):
+            rows[row] = bytearray(columns)
+        tiles = [bytes((tile,)) for tile in range(256)]
+        for runs in chunks:
+            for i in range(0, len(runs), 4):
+                row, col, length, tile = runs[i:i + 4]
+                start = max(col - first_column, 0)
+                stop = min(col + length - first_column, columns)
+                if 0 <= row < len(rows) and start < stop:
+                    rows[row][start:stop] = tiles[tile] * (stop - start)
+        self.origin = first_column
+        self.columns = columns
+        self.top_row = next((row for row, cells in enumerate(rows) if any(cells)),
+                            self.ground_row)
+        self._all_boxes = None
+
+    def tile(self, column, row):
+        if not 0 <= row < len(self.rows):
+            return EMPTY
+        index = column - self.origin
+        if 0 <= index < self.columns:
+            return self.rows[row][index]
+        return self.default[row]
+
+    def tile_at(self, x, y):
+        size = self.tile_size
+        return self.tile(int(x // size), int(y // size))
+
+    def _segment(self, row, first, last):
+        """Tiles of columns first..last of a row, outside the window included"""
+        start = first - self.origin
+        stop = last + 1 - self.origin
+        if 0 <= start and stop <= self.columns:
+            return self.rows[row][start:stop]
+        count = last - first + 1
+        inside = self.rows[row][max(start, 0):max(min(stop, self.columns), 0)]
+        before = min(max(-start, 0), count)
+        fill = self.default[row:row + 1]
+        return fill * before + inside + fill * (count - before - len(inside))
+
+    def boxes(self, x, y, width, height):
+        """Solid tiles touching the rectangle, merged into Boxes
+
+        Runs of solid tiles in a row become one box, and a box grows down
+        while the next row has a run over exactly the same columns, so a
+        platform comes back as the single box it was authored as.
+        """
+        size = self.tile_size
+        first, last = int(x // size), int((x + width) // size)
+        top = max(int(y // size), 0)
+        bottom = min(int((y + height) // size), len(self.rows) - 1)
+        start, stop = first - self.origin, last + 1 - self.origin
+        inside = 0 <= start and stop <= self.columns
+        rows = self.rows
+        found = []
+        open_runs = {}  # (start, stop) span of the segment -> top row of its box
+        for row in range(top, bottom + 2):
+            if row > bottom:
+                spans = ()
+            else:
+                segment = rows[row][start:stop] if inside else self._segment(row, first, last)
+                spans = {match.span() for match in _SOLID_RUN.finditer(segment)}
+            if open_runs:
+                for span in [s for s in open_runs if s not in spans]:
+                    start_row = open_runs.pop(span)
+                    found.append(Box((first + span[0]) * size, start_row * size,
+                                     (span[1] - span[0]) * size, (row - start_row) * size))
+            for span in spans:
+                if span not in open_runs:
+                    open_runs[span] = row
+        if len(found) > 1:
+            found.sort(key=lambda box: (box.y, box.x))
+        return found
+
+    def all_boxes(self):
+        """Every solid Box of the window, plus the default ground on both sides"""
+        if self._all_boxes is None:
+            size = self.tile_size
+            left, right = self.origin * size, (self.origin + self.columns) * size
+            found = self.boxes(left, 0, right - left - 1, len(self.rows) * size) if self.columns else []
+            top, depth = self.ground_row * size, (len(self.rows) - self.ground_row) * size
+            far = 2 ** 31
+            found += [Box(left - far, top, far, depth), Box(right, top, far, depth)]
+            found.sort(key=lambda box: (box.y, box.x))
+            self._all_boxes = found
+        return self._all_boxes
+
+    def scan_boxes(self, x, y, width, height):
+        """boxes() by testing every solid box of the window, for comparison"""
+        return [box for box in self.all_boxes()
+                if box.x <= x + width and x <= box.x + box.width and
+                box.y <= y + height and y <= box.y + box.height]
+
+    def landing_y(self, x, y, width, height, dx, dy):
+        """New y of a box falling by (dx, dy) that lands on a tile top, or None
+
+        A tile top is a solid tile under an empty one. Row boundaries are
+        checked in the order the box's bottom reaches them; the box lands
+        on the first one where, at that moment, it is over a tile top.
+        EnemyPool._landing_y is the vectorized copy of this.
+        """
+        if dy <= 0:
+            return None
+        size = self.tile_size
+        bottom = y + height
+        row = math.ceil(bottom / size)
+        while row < len(self.rows):
+            t = (row * size - bottom) / dy
+            if t > 1:
+                return None
+            if row >= 0:
+                left = x + dx * t
+                for column in range(math.floor(left / size), math.ceil((left + width) / size)):
+                    if self.tile(column, row) != EMPTY and self.tile(column, row - 1) == EMPTY:
+                        return row * size - height
+            row += 1
+        return None
+
+    def rects(self, left, right):
+        """(tile, Box) for every run of one kind of tile in the window
+        overlapping pixels [left, right), merged down like boxes(), for drawing"""
+        size = self.tile_size
+        first, last = int(left // size) - self.origin, int(right // size) - self.origin
+        found = []
+        open_runs = {}  # (start, stop, tile) -> top row
+        for row, cells in enumerate(self.rows + [bytearray()]):
+            runs = set()
+            if cells.strip(b"\0"):
+                for match in _TILE_RUN.finditer(cells):
+                    start, stop = match.span()
+                    if stop > first and start <= last:
+                        runs.add((start, stop, cells[start]))
+            for run in [r for r in open_runs if r not in runs]:
+                top = open_runs.pop(run)
+                start, stop, tile = run
+                found.append((tile, Box((self.origin + start) * size, top * size,
+                                        (stop - start) * size, (row - top) * size)))
+            for run in runs:
+                open_runs.setdefault(run, row)
+        found.sort(key=lambda item: (item[1].y, item[1].x))
+        return found
@@ -0,0 +1,45 @@
+"""Fixed-timestep accumulator that decouples simulation ticks from rendering.
+
+The world always advances in whole ticks of 1/tick_rate seconds. Each
+rendered frame adds its real duration to an accumulator and runs as many
+ticks as fit; the leftover fraction of a tick becomes `alpha`, which the
+renderer uses to interpolate between the previous and the current tick.
+
+If a frame is so slow that more than `max_ticks` would be due, the extra
+time is dropped: the game slows down for a moment instead of spending
+ever longer catching up (the "spiral of death").
+
+    timestep = FixedTimestep(tick_rate=60, max_ticks=5)
+
+    def update(dt):
+        for _ in range(timestep.advance(dt)):
+            world.step(inputs)
+
+    def draw():
+        render.draw_game(screen, world, timestep.alpha)
+"""
+
+class FixedTimestep:
+    def __init__(self, tick_rate=60, max_ticks=5):
+        self.tick = 1.0 / tick_rate
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+        self.alpha = 1.0
+        self.ticks = 0  # Total ticks run
+        self.dropped = 0.0  # Seconds discarded by the catch-up cap
+
+    def advance(self, dt):
+        """Add a frame of dt seconds; returns how many ticks to run now"""
+        self.accumulator += dt
+        ticks = int(self.accumulator / self.tick)
+        if self.max_ticks and ticks > self.max_ticks:
+            self.dropped += (ticks - self.max_ticks) * self.tick
+            ticks = self.max_ticks
+            self.accumulator = self.tick * ticks  # Keep only what will be run
+        self.accumulator -= ticks * self.tick
+        # Guard against the accumulator drifting just below zero
+        if self.accumulator < 0:
+            self.accumulator = 0.0
+        self.alpha = self.accumulator / self.tick
+        self.ticks += ticks
+        return ticks
@@ -0,0 +1,641 @@
+"""Headless game simulation.
+
+Everything the game needs to advance one frame lives here: constants,
+entities, level setup and the World that owns them. Nothing in this module
+imports pygame or pgzero, so a World can be stepped without a window or a
+mixer, as fast as the CPU allows. main.py is a thin pgzero adapter over it.
+"""
+import random
+from array import array
+from collections import namedtuple
+
+import levels
+import snapshot
+from ai import AIScheduler
+from collision import SweepAndPrune, sweep
+from events import EventBus, Jumped, CoinCollected, HeroDamaged, Victory, GameOver
+from tilemap import TILE_SIZE, TileMap, chunk_runs, to_tiles
+
+# Game constants
+WIDTH = 1000
+HEIGHT = 600
+GRAVITY = 0.8
+JUMP_STRENGTH = -15
+PLAYER_SPEED = 5
+ENEMY_SPEED = 2
+WORLD_WIDTH = 2000  # Largura padrão do mundo (cada fase define a sua)
+GROUND_Y = HEIGHT - 100  # Top of the ground, wherever the level has no hole
+ACTIVE_RADIUS = 1000  # Entities farther than this from the hero go to sleep
+SLEEP_INTERVAL = 16  # Sleeping enemies get one update every N frames (0 = frozen)
+ACTIVITY_REFRESH = 8  # Frames between re-sorting entities into awake/sleeping
+USE_TILE_WINDOW = True  # False = scan every solid box of the loaded tiles (for comparison)
+COLLISION_SUBSTEPS = 1  # Slices each frame's gravity and movement is integrated in
+THINK_INTERVAL = 4  # Ticks between two AI decisions of an awake enemy
+THINK_BUDGET = None  # Max AI decisions per tick (None = no limit)
+ENEMY_DAMAGE = 20
+DAMAGE_COOLDOWN = 60  # Ticks before the same enemy can hurt the hero again
+COIN_VALUE = 10
+
+# Game states
+MENU = 0
+PLAYING = 1
+GAME_OVER = 2
+VICTORY = 3
+
+# Input for a single step: held keys (left, right, jump) plus key-downs
+# latched since the previous step (escape to the menu, start/restart level)
+Inputs = namedtuple("Inputs", ["left", "right", "jump", "escape", "start"],
+                    defaults=[False, False, False, False, False])
+NO_INPUT = Inputs()
+
+def swept_boxes(entity, dx, dy, world):
+    """Solid tile boxes near the box an entity covers while moving by (dx, dy)
+
+    Padded by the entity size so boxes reached while resolving an earlier
+    collision are still candidates.
+    """
+    width = entity.width + abs(dx)
+    height = entity.height + abs(dy)
+    pad = max(width, height)
+    query = world.tiles.boxes if USE_TILE_WINDOW else world.tiles.scan_boxes
+    return query(min(entity.x, entity.x + dx) - pad, min(entity.y, entity.y + dy) - pad,
+                 width + 2 * pad, height + 2 * pad)
+
+def move_solid(entity, dx, dy, world):
+    """Move by (dx, dy), stopping at the first solid tile face on each axis
+
+    Returns 1 if the entity landed on the ground or a platform, -1 if it
+    hit one from below and 0 otherwise.
+    """
+    boxes = swept_boxes(entity, dx, dy, world)
+    start_x, start_y = entity.x, entity.y
+    t = 0.0  # Fraction of the move done so far
+    blocked_y = 0
+    for _ in range(2):  # Each axis can be blocked once
+        rest = 1.0 - t
+        first = None
+        for box in boxes:
+            hit = sweep(entity, dx * rest, dy * rest, box)
+            if hit is not None and (first is None or hit[0] < first[0]):
+                first = hit
+                first_box = box
+        if first is None:
+            break
+        t += rest * first[0]
+        # The blocked axis stops at the contact face; the other keeps going
+        if first[1] == "x":
+            start_x = (first_box.x - entity.width if dx > 0
+                       else first_box.x + first_box.width)
+            dx = 0
+        else:
+            if dy > 0:
+                start_y = first_box.y - entity.height
+                blocked_y = 1
+            else:
+                start_y = first_box.y + first_box.height
+                blocked_y = -1
+            dy = 0
+        entity.x = start_x + dx * t
+        entity.y = start_y + dy * t
+    entity.x = start_x + dx
+    entity.y = start_y + dy
+    return blocked_y
+
+class Hero:
+    __slots__ = ("x", "y", "prev_x", "prev_y", "width", "height", "vel_x", "vel_y",
+                 "on_ground", "health", "max_health", "animation_frame", "animation_timer",
+                 "facing_right", "is_jumping", "is_running")
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.prev_x = x  # Position before the last update, for render interpolation
+        self.prev_y = y
+        self.width = 32
+        self.height = 32
+        self.vel_x = 0
+        self.vel_y = 0
+        self.on_ground = False
+        self.health = 100
+        self.max_health = 100
+        self.animation_frame = 0
+        self.animation_timer = 0
+        self.facing_right = True
+        self.is_jumping = False
+        self.is_running = False
+
+    def update(self, inputs, world):
+        self.prev_x = self.x
+        self.prev_y = self.y
+
+        # Horizontal movement
+        self.vel_x = 0
+        if inputs.left:
+            self.vel_x = -PLAYER_SPEED
+            self.facing_right = False
+            self.is_running = True
+        elif inputs.right:
+            self.vel_x = PLAYER_SPEED
+            self.facing_right = True
+            self.is_running = True
+        else:
+            self.is_running = False
+
+        # Jumping
+        if inputs.jump and self.on_ground:
+            self.vel_y = JUMP_STRENGTH
+            self.on_ground = False
+            self.is_jumping = True
+            world.emit(Jumped(world.frame, self.x, self.y))
+
+        # Gravity and movement are integrated in world.substeps slices; with
+        # one substep this is the plain per-frame update
+        substeps = world.substeps
+        for _ in range(substeps):
+            self.vel_y += GRAVITY / substeps
+
+            # Move, stopping at the first solid tile face on each axis
+            blocked_y = move_solid(self, self.vel_x / substeps, self.vel_y / substeps, world)
+            if blocked_y:
+                # Landing on top of or hitting a platform from below
+                self.vel_y = 0
+                if blocked_y > 0:
+                    self.is_jumping = False
+            self.on_ground = blocked_y > 0
+
+            # Keep player in world bounds
+            if self.x < 0:
+                self.x = 0
+            elif self.x > world.world_width - self.width:
+                self.x = world.world_width - self.width
+
+        # Update animation
+        self.animation_timer += 1
+        if self.animation_timer >= 8:
+            self.animation_timer = 0
+            self.animation_frame = (self.animation_frame + 1) % 4
+
+class Enemy:
+    __slots__ = ("x", "y", "prev_x", "prev_y", "width", "height", "vel_x", "vel_y",
+                 "type", "health", "max_health", "animation_frame", "animation_timer",
+                 "on_ground", "patrol_start", "patrol_end", "is_attacking", "attack_timer",
+                 "next_hit_frame")
+
+    def __init__(self, x, y, enemy_type="basic"):
+        self.x = x
+        self.y = y
+        self.prev_x = x
+        self.prev_y = y
+        self.width = 24
+        self.height = 24
+        self.vel_x = -ENEMY_SPEED
+        self.vel_y = 0
+        self.type = enemy_type
+        self.health = 30 if enemy_type == "basic" else 50
+        self.max_health = self.health
+        self.animation_frame = 0
+        self.animation_timer = 0
+        self.on_ground = False
+        self.patrol_start = x - 50  # Área de patrulha
+        self.patrol_end = x + 50
+        self.is_attacking = False
+        self.attack_timer = 0
+        self.next_hit_frame = 0  # First frame this enemy may hurt the hero again
+
+    def update(self, hero, world):
+        """Think and move in one go (for enemies outside the AI scheduler)"""
+        self.think(hero)
+        self.move(world)
+
+    def think(self, hero):
+        """Decide whether to chase the hero; run on the enemy's think ticks"""
+        # Check if hero is nearby (within attack range)
+        distance_to_hero = abs(self.x - hero.x)
+        if distance_to_hero < 100:  # Attack range
+            self.is_attacking = True
+            self.attack_timer = 60  # Attack for 1 second
+            # Move towards hero
+            if hero.x < self.x:
+                self.vel_x = -ENEMY_SPEED * 1.5  # Faster when attacking
+            else:
+                self.vel_x = ENEMY_SPEED * 1.5
+        else:
+            self.is_attacking = False
+
+    def move(self, world):
+        """Carry out the last decision and integrate movement; runs every tick"""
+        self.prev_x = self.x
+        self.prev_y = self.y
+
+        if self.is_attacking and self.attack_timer > 0:
+            self.attack_timer -= 1
+        else:
+            # Normal patrol behavior
+            # Reverse direction at patrol boundaries
+            if self.x <= self.patrol_start or self.x >= self.patrol_end:
+                self.vel_x = -self.vel_x
+
+        substeps = world.substeps
+        for _ in range(substeps):
+            # Apply gravity
+            self.vel_y += GRAVITY / substeps
+
+            # Update position; enemies pass through solid tiles sideways and
+            # from below and only land on their tops
+            dx = self.vel_x / substeps
+            dy = self.vel_y / substeps
+            landing_y = world.tiles.landing_y(self.x, self.y, self.width, self.height, dx, dy)
+            self.x += dx
+            self.on_ground = landing_y is not None
+            if self.on_ground:
+                self.y = landing_y
+                self.vel_y = 0
+            else:
+                self.y += dy
+
+        # Update animation
+        self.animation_timer += 1
+        if self.animation_timer >= 12:
+            self.animation_timer = 0
+            self.animation_frame = (self.animation_frame + 1) % 3
+
+class Coin:
+    __slots__ = ("x", "y", "width", "height", "animation_frame", "animation_timer",
+                 "collected", "key")
+
+    def __init__(self, x, y, key=None):
+        self.x = x
+        self.y = y
+        self.key = key  # (chunk, index) in the level data
+        self.width = 16
+        self.height = 16
+        self.animation_frame = 0
+        self.animation_timer = 0
+        self.collected = False
+
+    def update(self):
+        if not self.collected:
+            self.animation_timer += 1
+            if self.animation_timer >= 10:
+                self.animation_timer = 0
+                self.animation_frame = (self.animation_frame + 1) % 4
+
+class World:
+    """Owns all game state and advances it one fixed frame per step()
+
+    Side effects that need a window or a mixer (sounds, drawing) are left to
+    the caller: each step() records what happened as events.py events, in
+    `events` for that step and queued on `bus` for batched dispatch. An
+    enemy touching the hero hurts it once, then not again for
+    DAMAGE_COOLDOWN ticks however long the contact lasts.
+
+    Levels come from levels.py and are streamed in x-chunks: `enemies` and
+    `coins` only hold entities of chunks near the camera, and only those
+    are updated. The ground and platforms of the same chunks are tiles in
+    `tiles` (see tilemap.py); falling through a hole in the ground ends the
+    run.
+
+    Of the resident entities, only those within `active_radius` of the
+    hero are fully simulated (see refresh_activity); active_radius=None
+    simulates everything every frame.
+
+    With use_enemy_pool=True enemies are simulated by a NumPy EnemyPool
+    instead of per-object Enemy.update calls; `enemies` then only holds the
+    spawn list the pool was built from. The pool always updates every
+    resident enemy, since one vectorized pass is cheaper than partitioning.
+
+    Awake enemies move every tick but only think (decide whether to chase)
+    on their turn of the AIScheduler in `ai`: every think_interval ticks,
+    at most think_budget decisions per tick.
+
+    start() keeps a snapshot (see snapshot.py) of the level as it began,
+    and restart() returns to it instead of rebuilding the level.
+
+    Movement against solid tiles is swept (see collision.sweep), so nothing
+    tunnels through a platform however fast it moves. `substeps` splits
+    each frame's gravity and movement into that many slices, for a finer
+    integration when speeds or GRAVITY are raised.
+    """
+
+    def __init__(self, use_enemy_pool=False, seed=None,
+                 active_radius=ACTIVE_RADIUS, sleep_interval=SLEEP_INTERVAL,
+                 substeps=COLLISION_SUBSTEPS, think_interval=THINK_INTERVAL,
+                 think_budget=THINK_BUDGET):
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        # All game randomness must come from here so replays are deterministic
+        self.rng = random.Random(seed)
+        self.use_enemy_pool = use_enemy_pool
+        self.enemy_pool = None
+        self.active_radius = active_radius
+        self.sleep_interval = sleep_interval
+        self.substeps = substeps
+        self.ai = AIScheduler(think_interval, think_budget)
+        self.awake_enemies = []
+        self.sleeping_enemies = []
+        self.active_coins = []
+        self.coin_broadphase = SweepAndPrune()
+        self.enemy_broadphase = SweepAndPrune()
+        self.hero = None
+        self.enemies = []
+        self.obstacles = []
+        self.coins = []
+        self.tiles = TileMap(HEIGHT // TILE_SIZE, GROUND_Y // TILE_SIZE)
+        self.game_state = MENU
+        self.score = 0
+        self.level = 1
+        self.camera_x = 0
+        self.prev_camera_x = 0  # camera_x before the last step, for render interpolation
+        self.frame = 0
+        self.generation = 0  # Bumped every time a level is built
+        self.layout_version = 0  # Bumped whenever resident entities change
+        self.level_data = None
+        self.world_width = WORLD_WIDTH
+        self.resident_chunks = {}
+        self.chunk_window = None
+        self.collected_coins = set()
+        self.coin_log = array("i")
+        self.coins_collected = 0
+        self.start_snapshot = None  # snapshot.save() of the level as started
+        self.events = []
+        self.bus = EventBus()
+        self.profiler = None  # Optional profiler.Profiler timing each phase
+
+    def init_game(self, level=1, level_data=None):
+        """Load level `level` and stream in the chunks around the hero
+
+        `level_data` (a levels.LevelData or BinaryLevel) overrides the file
+        lookup, e.g. for generated or synthetic levels.
+        """
+        # Clear all objects
+        self.enemies.clear()
+        self.obstacles.clear()
+        self.coins.clear()
+        self.events.clear()
+        self.generation += 1
+
+        self.level = level
+        self.level_data = level_data if level_data is not None else levels.load_level(level)
+        self.world_width = self.level_data.width
+        self.resident_chunks = {}
+        self.chunk_window = None
+        self.collected_coins = set()  # (chunk, index) of coins already taken
+        self.coin_log = array("i")  # The same keys flattened, in the order taken
+        self.coins_collected = 0
+
+        # Create hero
+        self.hero = Hero(*self.level_data.hero)
+
+        self.score = 0
+        self.frame = 0
+        self.follow_hero()
+        self.prev_camera_x = self.camera_x
+        self.stream_chunks()
+
+    def start(self, level=1, level_data=None):
+        """Build the level and switch to PLAYING"""
+        self.init_game(level, level_data)
+        self.game_state = PLAYING
+        self.start_snapshot = None  # Not nested in the new one
+        self.start_snapshot = snapshot.save(self)
+
+    def restart(self):
+        """Restart the current level from the snapshot taken as it started
+
+        The level data is reused, so generated levels restart as
+        themselves instead of being reloaded from a file.
+        """
+        if self.start_snapshot is None:
+            self.start(self.level)
+        else:
+            snapshot.restore(self, self.start_snapshot)
+
+    def next_level(self):
+        """Level number that follows the current one (wraps to the first)"""
+        if levels.level_path(self.level + 1) is not None:
+            return self.level + 1
+        return 1
+
+    def follow_hero(self):
+        # Update camera to follow hero
+        camera_x = self.hero.x - WIDTH // 2
+        if camera_x < 0:
+            camera_x = 0
+        elif camera_x > self.world_width - WIDTH:
+            camera_x = self.world_width - WIDTH
+        self.camera_x = camera_x
+
+    def stream_chunks(self):
+        """Load chunks within one chunk of the camera and unload the rest
+
+        Enemies in an unloaded chunk respawn at their start position when it
+        comes back; collected coins are remembered and stay collected.
+        """
+        data = self.level_data
+        chunk_width = data.chunk_width
+        first = max(0, int((self.camera_x - chunk_width) // chunk_width))
+        last = min(data.chunk_count - 1, int((self.camera_x + WIDTH + chunk_width) // chunk_width))
+        if (first, last) == self.chunk_window:
+            return
+        self.chunk_window = (first, last)
+
+        if self.enemy_pool is not None:
+            self.enemy_pool.write_back(self.enemies)
+
+        resident = self.resident_chunks
+        for index in list(resident):
+            if not first <= index <= last:
+                del resident[index]
+        for index in range(first, last + 1):
+            if index not in resident:
+                resident[index] = self.build_chunk(index)
+
+        # Resident tiles and entity lists, in level order
+        left = to_tiles(first * chunk_width)
+        right = to_tiles(min((last + 1) * chunk_width, data.width))
+        self.tiles.load(left, right - left, [resident[index][0] for index in sorted(resident)])
+        self.enemies[:] = [e for index in sorted(resident) for e in resident[index][1]]
+        self.coins[:] = [c for index in sorted(resident) for c in resident[index][2]]
+        self.layout_version += 1
+
+        # Build the broadphases once per layout; coins never move and the
+        # enemy one is kept sorted incrementally from here on
+        self.coin_broadphase = SweepAndPrune(coin for coin in self.coins if not coin.collected)
+        self.enemy_broadphase = SweepAndPrune(() if self.use_enemy_pool else self.enemies)
+        if self.use_enemy_pool:
+            from enemy_pool import EnemyPool
+            self.enemy_pool = EnemyPool.from_enemies(self.enemies, self.tiles)
+        self.refresh_activity()
+
+    def refresh_activity(self):
+        """Split resident entities into awake and sleeping ones
+
+        An enemy stays awake while the span it can cover (its patrol area
+        plus wherever a chase has taken it) is within active_radius of the
+        hero, so an enemy patrolling back towards the screen is already
+        awake before it gets there. Collected coins are dropped for good.
+        """
+        if any(coin.collected for coin in self.coins):
+            self.coins[:] = [coin for coin in self.coins if not coin.collected]
+        if self.active_radius is None:
+            self.awake_enemies = self.enemies
+            self.sleeping_enemies = []
+            self.active_coins = list(self.coins)
+            return
+
+        left = self.hero.x - self.active_radius
+        right = self.hero.x + self.active_radius
+        awake = []
+        sleeping = []
+        for enemy in self.enemies:
+            if (min(enemy.x, enemy.patrol_start) < right and
+                    max(enemy.x, enemy.patrol_end) + enemy.width > left):
+                awake.append(enemy)
+            else:
+                sleeping.append(enemy)
+        self.awake_enemies = awake
+        self.sleeping_enemies = sleeping
+        self.active_coins = [coin for coin in self.coins if left < coin.x < right]
+
+    def build_chunk(self, index):
+        data = self.level_data
+        chunk = data.load_chunk(index)
+        e, c = chunk.enemies, chunk.coins
+        tiles = self.tiles
+        runs = chunk_runs(chunk, index * data.chunk_width,
+                          min((index + 1) * data.chunk_width, data.width),
+                          tiles.ground_row, len(tiles.rows))
+        enemies = [Enemy(e[i], e[i + 1], levels.ENEMY_TYPES[e[i + 2]]) for i in range(0, len(e), 3)]
+        coins = [Coin(c[i], c[i + 1], (index, i // 2)) for i in range(0, len(c), 2)]
+        for coin in coins:
+            if coin.key in self.collected_coins:
+                coin.collected = True
+        return runs, enemies, coins
+
+    def step(self, inputs=NO_INPUT):
+        """Advance the simulation by one frame"""
+        self.events.clear()
+        if inputs.start and self.game_state != PLAYING:
+            if self.game_state == VICTORY:
+                score = self.score
+                self.start(self.next_level())
+                self.score = score  # Score carries over to the next level
+            elif self.game_state == GAME_OVER:
+                self.restart()
+            else:
+                self.start()
+            return
+        hero = self.hero
+        if self.game_state != PLAYING or hero is None:
+            return
+        if inputs.escape:
+            self.game_state = MENU
+            return
+        self.frame += 1
+        prof = self.profiler
+        if prof:
+            prof.start()
+
+        # Update game objects
+        hero.update(inputs, self)
+        if prof:
+            prof.mark("hero")
+        if self.frame % ACTIVITY_REFRESH == 0:
+            self.refresh_activity()
+        if self.enemy_pool is not None:
+            self.enemy_pool.update(hero, self.substeps, self.ai.select(len(self.enemy_pool)))
+        else:
+            awake = self.awake_enemies
+            start, count = self.ai.select(len(awake))
+            for i in range(start, start + count):
+                awake[i % len(awake)].think(hero)
+            for enemy in awake:
+                enemy.move(self)
+            if self.sleep_interval and self.frame % self.sleep_interval == 0:
+                for enemy in self.sleeping_enemies:
+                    enemy.update(hero, self)
+                    # Sleepers jump between rare updates; don't interpolate them
+                    enemy.prev_x = enemy.x
+                    enemy.prev_y = enemy.y
+            # No enemy moves more than its chase speed in one frame
+            self.enemy_broadphase.advance(abs(ENEMY_SPEED) * 1.5)
+        if prof:
+            prof.mark("enemies")
+        for coin in self.active_coins:
+            coin.update()
+        if prof:
+            prof.mark("coins")
+
+        self.prev_camera_x = self.camera_x
+        self.follow_hero()
+        self.stream_chunks()
+        if prof:
+            prof.mark("camera")
+
+        # Check coin collection
+        collected = self.coin_broadphase.overlapping(hero)
+        for coin in collected:
+            coin.collected = True
+            self.collected_coins.add(coin.key)
+            self.coin_log.extend(coin.key)
+            self.coin_broadphase.remove(coin)
+            self.coins_collected += 1
+            self.score += COIN_VALUE
+            self.emit(CoinCollected(self.frame, coin.x, coin.y, self.score))
+        if collected:
+            self.active_coins = [coin for coin in self.active_coins if not coin.collected]
+
+        # Check enemy collisions; each enemy hurts once per cooldown
+        frame = self.frame
+        if self.enemy_pool is not None:
+            pool = self.enemy_pool
+            hits = [levels.ENEMY_TYPES[pool.type[i]] for i in pool.strike(
+                hero.x, hero.y, hero.width, hero.height, frame, DAMAGE_COOLDOWN)]
+        else:
+            hits = []
+            for enemy in self.enemy_broadphase.overlapping(hero):
+                if enemy.next_hit_frame <= frame:
+                    enemy.next_hit_frame = frame + DAMAGE_COOLDOWN
+                    hits.append(enemy.type)
+        for enemy_type in hits:
+            hero.health -= ENEMY_DAMAGE
+            self.emit(HeroDamaged(frame, ENEMY_DAMAGE, hero.health, enemy_type))
+            if hero.health <= 0 and self.game_state == PLAYING:
+                self.game_state = GAME_OVER
+                self.emit(GameOver(frame, self.score))
+        # Fell through a hole in the ground
+        if hero.y > HEIGHT and self.game_state == PLAYING:
+            self.game_state = GAME_OVER
+            self.emit(GameOver(frame, self.score))
+
+        # Check victory condition
+        if hero.x >= self.world_width - 50 and self.game_state == PLAYING:
+            self.game_state = VICTORY
+            self.emit(Victory(frame, self.score))
+        if prof:
+            prof.mark("collisions")
+
+    def enemy_positions(self):
+        """(x, y) of every resident enemy, from the pool when it simulates them"""
+        pool = self.enemy_pool
+        if pool is not None:
+            return list(zip(pool.x.tolist(), pool.y.tolist()))
+        return [(enemy.x, enemy.y) for enemy in self.enemies]
+
+    def emit(self, event):
+        """Record an event for this step and queue it on the bus"""
+        self.events.append(event)
+        self.bus.publish(event)
+
+    def run(self, policy, max_frames):
+        """Step until the level ends or max_frames elapse; returns frames run
+
+        `policy` is called with the world before every step and returns the
+        Inputs for that step.
+        """
+        frames = 0
+        while self.game_state == PLAYING and frames < max_frames:
+            self.step(policy(self))
+            frames += 1
+        return frames